@@ -1,38 +1,94 @@
-import sys
+import os
+
+import click
+
+from typing import List
 
 from docterella.agents.base import ValidationAgent
 from docterella.parsers.file_parser import FileParser
+from docterella.parsers.project_parser import ProjectParser
 from docterella.connections.ollama_connection import OllamaConnection
 from docterella.connections.anthropic_connection import AnthropicConnection
 
+from docterella.journal import Journal
+from docterella.planner import DryRunPlanner
+from docterella.planner import lookup_pricing
 from docterella.runner import Runner
 from docterella.docstrings.numpy import NumpyStyleBuilder
 from docterella.docstrings.google import GoogleStyleBuilder
 from docterella.agents.config import AgentConfigFactory
 
-from docterella.reports.json import JSONReport
+from docterella.reports.stream import StreamingReport
 
-def main():
-    filename = sys.argv[1]
+@click.command()
+@click.argument('filename', type=click.Path(exists=True))
+@click.option('--output', '-o', type=click.Path(), default="test_output.json",
+              help="File the report is written to, as JSON lines if it ends in .jsonl")
+@click.option('--journal', '-j', type=click.Path(), default=None,
+              help="Record each result to this file as it completes")
+@click.option('--resume', is_flag=True, default=False,
+              help="Skip the nodes already recorded in the journal")
+@click.option('--dry-run', is_flag=True, default=False,
+              help="Print the projected tokens, cost and time without calling the model")
+@click.option('--style', '-s', multiple=True,
+              help="Styles to project with --dry-run, defaults to basic")
+@click.option('--concurrency', '-c', type=int, default=1,
+              help="Requests in flight at once, used by --dry-run to project the time")
+def main(
+    filename: str,
+    output: str,
+    journal: str,
+    resume: bool,
+    dry_run: bool,
+    style: List[str],
+    concurrency: int,
+):
+    if resume and journal is None:
+        raise click.UsageError("--resume requires --journal")
 
     # connection = AnthropicConnection("claude-3-5-haiku-20241022")
     connection = OllamaConnection("llama3.1:8b-instruct-q8_0")
     # connection = OllamaConnection("phi4-mini:latest")
    # connection = OllamaConnection("phi4-mini-reasoning:3.8b")
 
+    if os.path.isdir(filename):
+        parser = ProjectParser(filename)
+    else:
+        parser = FileParser(filename)
+
+    if dry_run:
+        styles = style or ["basic"]
+        planner = DryRunPlanner(
+            parser,
+            {s: ValidationAgent(connection, AgentConfigFactory.create(s)) for s in styles},
+            pricing={s: lookup_pricing(connection.model) for s in styles},
+            concurrency=concurrency,
+        )
+
+        print(planner.plan().to_text())
+        return
+
     validator = ValidationAgent(connection, AgentConfigFactory.create('basic'))
-    parser = FileParser(filename)
+    connection.warm_up(validator.function_prompt)
     
-    runner = Runner(parser, validator)
+    if journal is not None:
+        journal = Journal(journal, resume=resume)
+
+    runner = Runner(parser, validator, journal=journal)
 
     results = runner.validate_sequence()
 
     nsb = NumpyStyleBuilder()
     gsb = GoogleStyleBuilder()
 
-    report = JSONReport(results)
+    report = StreamingReport(results, array=not output.endswith(".jsonl"))
+
+    report.to_file(output)
+
+    if journal is not None:
+        journal.close()
 
-    report.to_file("test_output.json")
+    print(runner.usage.to_text())
 
     # print(nsb.to_docstring(res))
     # print(gsb.to_docstring(res))
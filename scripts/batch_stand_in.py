@@ -0,0 +1,354 @@
+"""Local stand-in for the Anthropic and OpenAI batch apis.
+
+Serves the endpoints `AnthropicConnection` and `OpenaiConnection` use for
+batches, along with the single request endpoints used to resend requests
+missing from a batch, so `BatchRunner` can be exercised without an api key
+or cost. Every response is a minimal instance of the requested JSON schema.
+Batches finish `--delay` seconds after they are submitted and every
+`--fail-every`-th request is left out of the results.
+
+Run the stand-in on its own with `serve` and point a connection's `base_url`
+at it, or validate a file or tree against it with `run`.
+"""
+import ast
+import itertools
+import json
+import os
+import re
+import threading
+import time
+
+import click
+
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from typing import Dict
+from typing import List
+
+from docterella.agents.base import ValidationAgent
+from docterella.agents.config import AgentConfigFactory
+from docterella.connections.anthropic_connection import AnthropicConnection
+from docterella.connections.openai_connection import OpenaiConnection
+from docterella.parsers.file_parser import FileParser
+from docterella.parsers.project_parser import ProjectParser
+from docterella.runner import BatchRunner
+
+USAGE = {"input_tokens": 1200, "output_tokens": 150, "cached_tokens": 1000}
+
+def example(schema: Dict, root: Dict):
+    """Builds a minimal value matching a JSON schema"""
+    if "$ref" in schema:
+        resolved = root
+
+        for part in schema["$ref"].removeprefix("#/").split("/"):
+            resolved = resolved[part]
+
+        return example(resolved, root)
+
+    for key in ("anyOf", "allOf"):
+        if key in schema:
+            variants = [v for v in schema[key] if v.get("type") != "null"]
+            return example(variants[0], root)
+
+    kind = schema.get("type")
+
+    if kind == "object":
+        return {k: example(v, root) for k, v in schema.get("properties", {}).items()}
+
+    return {"string": "stand-in", "boolean": True, "integer": 0, "number": 0}.get(kind, [])
+
+
+class StandInState:
+    def __init__(self, delay: float, fail_every: int):
+        self.delay = delay
+        self.fail_every = fail_every
+        self.batches: Dict[str, Dict] = {}
+        self.files: Dict[str, bytes] = {}
+        self.ids = itertools.count()
+        self.lock = threading.Lock()
+
+    def new_id(self, prefix: str) -> str:
+        with self.lock:
+            return f"{prefix}_{next(self.ids)}"
+
+    def is_done(self, batch: Dict) -> bool:
+        return time.time() - batch["submitted"] >= self.delay
+
+    def is_dropped(self, position: int) -> bool:
+        return self.fail_every > 0 and (position + 1) % self.fail_every == 0
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    state: StandInState = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+
+        if m := re.fullmatch(r"/v1/messages/batches/([^/]+)", path):
+            return self._send_json(self._anthropic_batch(m.group(1)))
+
+        if m := re.fullmatch(r"/v1/messages/batches/([^/]+)/results", path):
+            return self._send(self._anthropic_results(m.group(1)), "application/binary")
+
+        if m := re.fullmatch(r"/v1/batches/([^/]+)", path):
+            return self._send_json(self._openai_batch(m.group(1)))
+
+        if m := re.fullmatch(r"/v1/files/([^/]+)/content", path):
+            return self._send(self.state.files[m.group(1)], "application/octet-stream")
+
+        self.send_error(404)
+
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        body = self.rfile.read(int(self.headers.get("content-length", 0)))
+
+        if path == "/v1/messages":
+            return self._send_json(self._anthropic_message(json.loads(body)))
+
+        if path == "/v1/messages/batches":
+            batch_id = self.state.new_id("msgbatch")
+            self.state.batches[batch_id] = {
+                "submitted": time.time(), "requests": json.loads(body)["requests"]
+            }
+            return self._send_json(self._anthropic_batch(batch_id))
+
+        if path == "/v1/responses":
+            return self._send_json(self._openai_response(json.loads(body)))
+
+        if path == "/v1/files":
+            return self._send_json(self._upload(body))
+
+        if path == "/v1/batches":
+            return self._send_json(self._openai_submit(json.loads(body)))
+
+        self.send_error(404)
+
+    def _send(self, body: bytes, content_type: str):
+        self.send_response(200)
+        self.send_header("content-type", content_type)
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, value: Dict):
+        self._send(json.dumps(value).encode("utf-8"), "application/json")
+
+    def _anthropic_message(self, params: Dict) -> Dict:
+        # the schema is appended to the second system block as a python dict
+        schema = ast.literal_eval(params["system"][1]["text"].split("\n", 1)[1])
+        text = json.dumps(example(schema, schema))
+
+        return {
+            "id": self.state.new_id("msg"),
+            "type": "message",
+            "role": "assistant",
+            "model": params["model"],
+            # the connection prefills the opening brace
+            "content": [{"type": "text", "text": text[1:]}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {
+                "input_tokens": USAGE["input_tokens"] - USAGE["cached_tokens"],
+                "output_tokens": USAGE["output_tokens"],
+                "cache_creation_input_tokens": 0,
+                "cache_read_input_tokens": USAGE["cached_tokens"],
+            },
+        }
+
+    def _anthropic_batch(self, batch_id: str) -> Dict:
+        done = self.state.is_done(self.state.batches[batch_id])
+        host = self.headers["host"]
+
+        return {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended" if done else "in_progress",
+            "request_counts": {
+                "processing": 0, "succeeded": 0, "errored": 0, "canceled": 0, "expired": 0
+            },
+            "created_at": "2025-01-01T00:00:00Z",
+            "expires_at": "2025-01-02T00:00:00Z",
+            "ended_at": None,
+            "cancel_initiated_at": None,
+            "archived_at": None,
+            "results_url": (
+                f"http://{host}/v1/messages/batches/{batch_id}/results" if done else None
+            ),
+        }
+
+    def _anthropic_results(self, batch_id: str) -> bytes:
+        lines = []
+
+        for i, request in enumerate(self.state.batches[batch_id]["requests"]):
+            if self.state.is_dropped(i):
+                result = {"type": "errored", "error": {"type": "api_error", "message": "dropped"}}
+            else:
+                result = {"type": "succeeded", "message": self._anthropic_message(request["params"])}
+
+            lines.append(json.dumps({"custom_id": request["custom_id"], "result": result}))
+
+        return "\n".join(lines).encode("utf-8")
+
+    def _openai_response(self, body: Dict) -> Dict:
+        schema = body["text"]["format"]["schema"]
+
+        return {
+            "id": self.state.new_id("resp"),
+            "object": "response",
+            "created_at": int(time.time()),
+            "model": body["model"],
+            "status": "completed",
+            "parallel_tool_calls": False,
+            "tool_choice": "auto",
+            "tools": [],
+            "output": [{
+                "id": self.state.new_id("msg"),
+                "type": "message",
+                "role": "assistant",
+                "status": "completed",
+                "content": [{
+                    "type": "output_text",
+                    "text": json.dumps(example(schema, schema)),
+                    "annotations": [],
+                }],
+            }],
+            "usage": {
+                "input_tokens": USAGE["input_tokens"],
+                "input_tokens_details": {"cached_tokens": USAGE["cached_tokens"]},
+                "output_tokens": USAGE["output_tokens"],
+                "output_tokens_details": {"reasoning_tokens": 0},
+                "total_tokens": USAGE["input_tokens"] + USAGE["output_tokens"],
+            },
+        }
+
+    def _upload(self, body: bytes) -> Dict:
+        # the jsonl content is the only file part of the multipart body
+        content = re.search(rb'filename="[^"]*"\r\n(?:[^\r\n]+\r\n)*\r\n(.*?)\r\n--', body, re.S)
+        file_id = self.state.new_id("file")
+        self.state.files[file_id] = content.group(1)
+
+        return {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(content.group(1)),
+            "created_at": int(time.time()),
+            "filename": "batch.jsonl",
+            "purpose": "batch",
+            "status": "processed",
+        }
+
+    def _openai_submit(self, params: Dict) -> Dict:
+        lines = []
+
+        for i, line in enumerate(self.state.files[params["input_file_id"]].splitlines()):
+            entry = json.loads(line)
+
+            if self.state.is_dropped(i):
+                response = {"status_code": 500, "body": {"error": {"message": "dropped"}}}
+            else:
+                response = {"status_code": 200, "body": self._openai_response(entry["body"])}
+
+            lines.append(json.dumps({"custom_id": entry["custom_id"], "response": response}))
+
+        output_id = self.state.new_id("file")
+        self.state.files[output_id] = "\n".join(lines).encode("utf-8")
+
+        batch_id = self.state.new_id("batch")
+        self.state.batches[batch_id] = {
+            "submitted": time.time(),
+            "input_file_id": params["input_file_id"],
+            "output_file_id": output_id,
+        }
+
+        return self._openai_batch(batch_id)
+
+    def _openai_batch(self, batch_id: str) -> Dict:
+        batch = self.state.batches[batch_id]
+        done = self.state.is_done(batch)
+
+        return {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": "/v1/responses",
+            "input_file_id": batch["input_file_id"],
+            "completion_window": "24h",
+            "status": "completed" if done else "in_progress",
+            "created_at": int(batch["submitted"]),
+            "output_file_id": batch["output_file_id"] if done else None,
+        }
+
+
+def start(port: int = 0, delay: float = 1.0, fail_every: int = 0) -> ThreadingHTTPServer:
+    """Starts the stand-in in a background thread, port 0 picks a free port"""
+    handler = type("Handler", (StandInHandler,), {"state": StandInState(delay, fail_every)})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
+
+@click.group()
+def cli():
+    """Local stand-in for the provider batch apis"""
+    pass
+
+@cli.command()
+@click.option('--port', '-p', type=int, default=8780, help='Port to listen on')
+@click.option('--delay', type=float, default=1.0, help='Seconds before a batch ends')
+@click.option('--fail-every', type=int, default=0,
+              help='Leave every n-th request out of the batch results')
+def serve(port: int, delay: float, fail_every: int):
+    """Serves the stand-in until interrupted"""
+    server = start(port, delay, fail_every)
+    print(f"Serving on http://127.0.0.1:{server.server_port}")
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+@cli.command()
+@click.argument('filename', type=click.Path(exists=True))
+@click.option('--provider', type=click.Choice(['anthropic', 'openai']), default='anthropic')
+@click.option('--style', '-s', default='basic', help='Prompt style to validate with')
+@click.option('--delay', type=float, default=1.0, help='Seconds before a batch ends')
+@click.option('--fail-every', type=int, default=5,
+              help='Leave every n-th request out of the batch results')
+def run(filename: str, provider: str, style: str, delay: float, fail_every: int):
+    """Validates FILENAME with a BatchRunner against the stand-in"""
+    server = start(delay=delay, fail_every=fail_every)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    # the clients refuse to start without a key, the stand-in ignores it
+    os.environ.setdefault("ANTHROPIC_API_KEY", "stand-in")
+    os.environ.setdefault("OPENAI_API_KEY", "stand-in")
+
+    if provider == "anthropic":
+        connection = AnthropicConnection("stand-in", base_url=base_url)
+    else:
+        connection = OpenaiConnection("stand-in", base_url=f"{base_url}/v1")
+
+    if os.path.isdir(filename):
+        parser = ProjectParser(filename)
+    else:
+        parser = FileParser(filename)
+
+    state_path = f"{filename.rstrip(os.sep)}.batch.json"
+    runner = BatchRunner(
+        parser,
+        ValidationAgent(connection, AgentConfigFactory.create(style)),
+        state_path,
+        poll_interval=min(delay, 1.0),
+    )
+
+    results: List = runner.run()
+    print(f"{len(results)} nodes validated")
+    print(runner.usage.to_text())
+
+    server.shutdown()
+
+if __name__ == "__main__":
+    cli()
@@ -32,6 +32,7 @@ from docterella.runner import Runner
 from docterella.agents.config import AgentConfigFactory
 from docterella.reports.json import JSONReport
 from docterella.results import ValidationResults
+from docterella.pydantic.metadata import make_node_id
 
 from pydantic import BaseModel
 
@@ -266,7 +267,7 @@ class TestCaseSuite:
         }
 
     def _get_response_node_id(self, response: Dict):
-        return f"{response['source_path']} : {response['name']} - {response['lineno']}"
+        return make_node_id(response['source_path'], response['name'], response['lineno'])
 
     def get_expected_response(self, result: ValidationResults):
         """Retrieve expected response for a specific validation result.
@@ -620,6 +621,9 @@ def benchmark_model(model: str, style: str, mc: MetricsCollector):
     """
     connection = load_model(model)
 
+    # load the model before the first case so no case pays for the load
+    connection.warm_up(AgentConfigFactory.create(style).function_prompt)
+
     for case in CASE_SUITES:
         print(f"\tRunning {case.label}...")
         metric, response = _benchmark_helper(connection, case, style)
@@ -703,6 +707,7 @@ def generate_standard(model: str,  style: str):
     connection = load_model(model)
 
     validator = ValidationAgent(connection, AgentConfigFactory.create(style))
+    connection.warm_up(validator.function_prompt)
     
     for case in CASE_SUITES:
         print(f"Generating for case {case.label}...", end='', flush=True)
@@ -0,0 +1,96 @@
+"""Simulates hedged requests on a pool of backends with stragglers.
+
+Each simulated backend answers after the median latency, give or take a
+fifth, except for a share of stragglers that take `--slowdown` times as
+long. The same requests are sent through a `PooledConnection` without and
+with hedging, and the latency quantiles of both runs are compared.
+"""
+import random
+import time
+
+import click
+
+from concurrent.futures import ThreadPoolExecutor
+from pydantic import BaseModel
+from typing import List
+
+from docterella.connections.base_connection import BaseConnection
+from docterella.connections.pool import HealthCheck
+from docterella.connections.pool import PooledConnection
+
+class SimulatedConnection(BaseConnection):
+    def __init__(self, name: str, median: float, stragglers: float, slowdown: float):
+        self.model = name
+        self.options = {}
+        self.median = median
+        self.stragglers = stragglers
+        self.slowdown = slowdown
+
+    def prompt(self, instructions: str, prompt: str, output_structure: BaseModel):
+        latency = self.median * random.uniform(0.8, 1.2)
+
+        if random.random() < self.stragglers:
+            latency *= self.slowdown
+
+        time.sleep(latency)
+
+        return '{"ok": true}'
+
+
+def quantile(latencies: List[float], q: float) -> float:
+    latencies = sorted(latencies)
+    return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+def simulate(pool: PooledConnection, requests: int, concurrency: int) -> List[float]:
+    def timed(_):
+        start = time.monotonic()
+        pool.complete("", "", HealthCheck)
+        return time.monotonic() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(timed, range(requests)))
+
+    pool.close()
+
+    return latencies
+
+@click.command()
+@click.option('--requests', '-n', type=int, default=2000, help='Requests to send')
+@click.option('--backends', type=int, default=2, help='Backends in the pool')
+@click.option('--concurrency', '-c', type=int, default=4, help='Requests sent at the same time')
+@click.option('--median', type=float, default=0.02, help='Median latency in seconds')
+@click.option('--stragglers', type=float, default=0.03, help='Share of slow requests')
+@click.option('--slowdown', type=float, default=10.0, help='Latency multiple of a straggler')
+@click.option('--budget', type=float, default=0.1, help='Hedge budget of the hedged run')
+@click.option('--seed', type=int, default=0, help='Seed of the simulated latencies')
+def cli(
+    requests: int,
+    backends: int,
+    concurrency: int,
+    median: float,
+    stragglers: float,
+    slowdown: float,
+    budget: float,
+    seed: int,
+):
+    """Compares the latency quantiles of a pool without and with hedging"""
+    random.seed(seed)
+
+    print(f"{'':<10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'hedges':>7} {'won':>5}")
+
+    for name, hedge_budget in (("unhedged", 0.0), ("hedged", budget)):
+        connections = [
+            SimulatedConnection(f"backend-{i}", median, stragglers, slowdown)
+            for i in range(backends)
+        ]
+        pool = PooledConnection(connections, max_in_flight=concurrency, hedge_budget=hedge_budget)
+        latencies = simulate(pool, requests, concurrency)
+
+        print(
+            f"{name:<10} {quantile(latencies, 0.5) * 1000:>8.1f} "
+            f"{quantile(latencies, 0.95) * 1000:>8.1f} {quantile(latencies, 0.99) * 1000:>8.1f} "
+            f"{pool.hedges:>7} {pool.hedges_won:>5}"
+        )
+
+if __name__ == "__main__":
+    cli()
@@ -1,44 +1,495 @@
+import asyncio
+import logging
+import time
+
 from abc import ABC
 from abc import abstractmethod
 
+from pydantic import ValidationError
+
+from docterella.cache import ResultCache
 from docterella.connections.base_connection import BaseConnection
+from docterella.connections.errors import RequestTimeoutError
+from docterella.connections.usage import Completion
+from docterella.connections.usage import Usage
 
 from docterella.results import ValidationResults
 from docterella.pydantic.metadata import FunctionMetadata
 from docterella.pydantic.metadata import ClassMetadata
+from docterella.pydantic.metadata import MetaDataTypes
+from docterella.pydantic.packed import packed_output
+from docterella.prompts.packed_prompt import PACKED_FUNCTIONS_PROMPT
+
+from typing import Dict
+from typing import List
 
 from docterella.agents.config import AgentConfig
 from docterella.agents.config import BasicConfig
+from docterella.agents.errors import InvalidResponseError
+from docterella.agents.escalation import EscalationPolicy
+from docterella.agents.repair import repair_json
+from docterella.agents.retry import RetryPolicy
+from docterella.agents.singleflight import SingleFlight
+from docterella.agents.prevalidator import Prevalidator
+from docterella.agents.slimmer import SourceSlimmer
+
+logger = logging.getLogger(__name__)
 
 class ValidationAgent:
     def __init__(
         self, 
         connection: BaseConnection, 
         config: AgentConfig = None,
+        cache: ResultCache = None,
+        prevalidator: Prevalidator = None,
+        slimmer: SourceSlimmer = None,
+        retry_policy: RetryPolicy = None,
+        escalation: EscalationPolicy = None,
+        singleflight: SingleFlight = None,
     ):
         if config is None:
             config = BasicConfig()
 
+        if retry_policy is None:
+            retry_policy = RetryPolicy()
+
         self.connection = connection
         self.config = config
+        self.cache = cache
+        self.prevalidator = prevalidator
+        self.slimmer = slimmer
+        self.retry_policy = retry_policy
+        self.escalation = escalation
+        self.singleflight = singleflight
 
     def validate_function(self, function: FunctionMetadata):
-        response = self.connection.prompt(
-            instructions=self.function_prompt,
-            prompt=function.source_code,
-            output_structure=self.function_output
-        )
+        assessment = self._precheck_function(function)
+
+        if assessment is not None:
+            return ValidationResults(function, assessment)
 
         try:
-            da = self.function_output.model_validate_json(response)
-        except Exception as e:
-            print(response)
-            raise e
+            assessment, usage = self._request(self._function_request(function))
+        except InvalidResponseError as e:
+            if not self._escalates_failures():
+                raise
+
+            usage = e.usage
 
-        return ValidationResults(function, da)
+        return self._result(function, assessment, usage)
 
     def validate_class(self, cls: ClassMetadata):
-        source = cls.constructor.source_code
+        try:
+            assessment, usage = self._request(self._class_request(cls))
+        except InvalidResponseError as e:
+            if not self._escalates_failures():
+                raise
+
+            assessment, usage = None, e.usage
+
+        return self._result(cls, assessment, usage)
+
+    async def avalidate_function(self, function: FunctionMetadata):
+        assessment = self._precheck_function(function)
+
+        if assessment is not None:
+            return ValidationResults(function, assessment)
+
+        try:
+            assessment, usage = await self._arequest(self._function_request(function))
+        except InvalidResponseError as e:
+            if not self._escalates_failures():
+                raise
+
+            usage = e.usage
+
+        return await self._aresult(function, assessment, usage)
+
+    async def avalidate_class(self, cls: ClassMetadata):
+        try:
+            assessment, usage = await self._arequest(self._class_request(cls))
+        except InvalidResponseError as e:
+            if not self._escalates_failures():
+                raise
+
+            assessment, usage = None, e.usage
+
+        return await self._aresult(cls, assessment, usage)
+
+    def validate_functions(self, functions: List[FunctionMetadata]):
+        """Validates several functions with as few requests as possible
+
+        Functions without a local or cached assessment are packed into one
+        request. Any function missing from, or invalid in, the packed
+        response is sent again on its own. The usage of the packed request
+        is shared equally between the functions it held.
+        """
+        assessments, requests, keys = self._prepare_requests(functions)
+        usages = [None] * len(functions)
+
+        if len(requests) > 1:
+            packed = len(requests)
+
+            try:
+                completion = self.connection.complete(**self._packed_request(requests))
+                self._share_usage(completion, usages, requests)
+                self._unpack(completion.text, assessments, requests, keys)
+            except self._packing_errors() as e:
+                logger.warning("Packed request failed: %s: %s", type(e).__name__, e)
+
+            self._log_unpacked(packed, requests)
+
+        for i, request in requests.items():
+            try:
+                assessments[i], usage = self._send(request, keys[i])
+            except InvalidResponseError as e:
+                if not self._escalates_failures():
+                    raise
+
+                usage = e.usage
+
+            usages[i] = Usage.total([usages[i], usage])
+
+        return [self._result(*args) for args in zip(functions, assessments, usages)]
+
+    async def avalidate_functions(self, functions: List[FunctionMetadata]):
+        assessments, requests, keys = self._prepare_requests(functions)
+        usages = [None] * len(functions)
+
+        if len(requests) > 1:
+            packed = len(requests)
+
+            try:
+                completion = await self.connection.acomplete(**self._packed_request(requests))
+                self._share_usage(completion, usages, requests)
+                self._unpack(completion.text, assessments, requests, keys)
+            except self._packing_errors() as e:
+                logger.warning("Packed request failed: %s: %s", type(e).__name__, e)
+
+            self._log_unpacked(packed, requests)
+
+        for i, request in requests.items():
+            try:
+                assessments[i], usage = await self._asend(request, keys[i])
+            except InvalidResponseError as e:
+                if not self._escalates_failures():
+                    raise
+
+                usage = e.usage
+
+            usages[i] = Usage.total([usages[i], usage])
+
+        return [await self._aresult(*args) for args in zip(functions, assessments, usages)]
+
+    def render_requests(self, nodes: List):
+        """Builds the requests validating `nodes` together would send, without sending them
+
+        Returns the requests along with the number of nodes they cover, which
+        excludes nodes with a local or cached assessment.
+        """
+        _, requests, _ = self._prepare_requests(nodes)
+
+        if len(requests) > 1:
+            return [self._packed_request(requests)], len(requests)
+
+        return list(requests.values()), len(requests)
+
+    def prepare_batch(self, nodes: List):
+        """Builds the requests a provider batch needs to send for `nodes`
+
+        Returns the local or cached assessment of every node, None where a
+        request is needed, along with those requests and their cache keys,
+        both keyed by the node's position.
+        """
+        return self._prepare_requests(nodes)
+
+    def complete_batch(
+        self,
+        nodes: List,
+        assessments: List,
+        requests: Dict[int, dict],
+        keys: Dict,
+        responses: Dict[int, Completion],
+    ):
+        """Turns the responses of a provider batch into results
+
+        Any request without a valid response in the batch is sent again on
+        its own.
+        """
+        usages = [None] * len(nodes)
+
+        for i, request in requests.items():
+            assessment = None
+
+            if i in responses:
+                assessment = self._parse(responses[i].text, request["output_structure"])
+                usages[i] = responses[i].usage
+
+            if assessment is not None:
+                self._cache_store(keys[i], assessment)
+            else:
+                try:
+                    assessment, usage = self._send(request, keys[i])
+                except InvalidResponseError as e:
+                    if not self._escalates_failures():
+                        raise
+
+                    usage = e.usage
+
+                usages[i] = Usage.total([usages[i], usage])
+
+            assessments[i] = assessment
+
+        return [self._result(*args) for args in zip(nodes, assessments, usages)]
+
+    def _result(self, node, assessment, usage: Usage = None):
+        """Builds a node's result, validating it again with the escalation agent if needed"""
+        if self.escalation is not None and self.escalation.should_escalate(node, assessment):
+            result = self.escalation.validate(node)
+            # the escalated node also paid for the fast model's request
+            result.usage = Usage.total([usage, result.usage])
+
+            return result
+
+        return ValidationResults(node, assessment, usage=usage)
+
+    async def _aresult(self, node, assessment, usage: Usage = None):
+        if self.escalation is not None and self.escalation.should_escalate(node, assessment):
+            result = await self.escalation.avalidate(node)
+            result.usage = Usage.total([usage, result.usage])
+
+            return result
+
+        return ValidationResults(node, assessment, usage=usage)
+
+    def _packing_errors(self):
+        """Errors of a packed request after which its functions are sent on their own"""
+        # smaller requests may still get through after a timeout, while an
+        # invalid item only loses the functions it was meant for
+        return self.retry_policy.retry_on + (RequestTimeoutError, ValidationError)
+
+    @staticmethod
+    def _log_unpacked(packed: int, requests: Dict[int, dict]):
+        if requests:
+            logger.info(
+                "%d of %d packed functions are sent again on their own", len(requests), packed
+            )
+
+    @staticmethod
+    def _share_usage(completion: Completion, usages: List, requests: Dict[int, dict]):
+        share = completion.usage.split(len(requests))
+
+        for i in requests:
+            usages[i] = share
+
+    def _escalates_failures(self) -> bool:
+        return self.escalation is not None and self.escalation.on_failure
+
+    def _request(self, request: dict):
+        """Returns the assessment of a request and the usage it took, None if cached"""
+        key, assessment = self._cache_lookup(request)
+
+        if assessment is not None:
+            return assessment, None
+
+        return self._send(request, key)
+
+    async def _arequest(self, request: dict):
+        key, assessment = self._cache_lookup(request)
+
+        if assessment is not None:
+            return assessment, None
+
+        return await self._asend(request, key)
+
+    def _send(self, request: dict, key: str = None):
+        if self.singleflight is None:
+            return self._send_with_retries(request, key)
+
+        (assessment, usage), shared = self.singleflight.do(
+            self._flight_key(request), lambda: self._send_with_retries(request, key)
+        )
+
+        # every waiter gets its own copy to bind to its node, the usage is
+        # only counted for the caller that sent the request
+        if shared:
+            return assessment.model_copy(deep=True), None
+
+        return assessment, usage
+
+    async def _asend(self, request: dict, key: str = None):
+        if self.singleflight is None:
+            return await self._asend_with_retries(request, key)
+
+        (assessment, usage), shared = await self.singleflight.ado(
+            self._flight_key(request), lambda: self._asend_with_retries(request, key)
+        )
+
+        if shared:
+            return assessment.model_copy(deep=True), None
+
+        return assessment, usage
+
+    def _flight_key(self, request: dict) -> str:
+        # copies of a function differ at most in trailing whitespace once dedented
+        prompt = "\n".join(line.rstrip() for line in request["prompt"].strip().splitlines())
+
+        return ResultCache.make_key(
+            self.connection,
+            request["instructions"],
+            prompt,
+            request["output_structure"],
+        )
+
+    def _send_with_retries(self, request: dict, key: str = None):
+        policy = self.retry_policy
+        response = None
+        usage = Usage.empty()
+
+        for attempt in range(policy.max_attempts):
+            try:
+                completion = self.connection.complete(**request)
+            except policy.retry_on as e:
+                if not policy.should_retry(attempt, e):
+                    raise
+
+                time.sleep(policy.delay(attempt, e))
+                continue
+
+            # every attempt is paid for, not only the one that succeeds
+            response = completion.text
+            usage.add(completion.usage)
+            assessment = self._parse(response, request["output_structure"])
+
+            if assessment is not None:
+                self._cache_store(key, assessment)
+                return assessment, usage
+
+        raise InvalidResponseError(
+            f"No valid response after {policy.max_attempts} attempts", response, usage
+        )
+
+    async def _asend_with_retries(self, request: dict, key: str = None):
+        policy = self.retry_policy
+        response = None
+        usage = Usage.empty()
+
+        for attempt in range(policy.max_attempts):
+            try:
+                completion = await self.connection.acomplete(**request)
+            except policy.retry_on as e:
+                if not policy.should_retry(attempt, e):
+                    raise
+
+                await asyncio.sleep(policy.delay(attempt, e))
+                continue
+
+            response = completion.text
+            usage.add(completion.usage)
+            assessment = self._parse(response, request["output_structure"])
+
+            if assessment is not None:
+                self._cache_store(key, assessment)
+                return assessment, usage
+
+        raise InvalidResponseError(
+            f"No valid response after {policy.max_attempts} attempts", response, usage
+        )
+
+    def _prepare_requests(self, nodes: List):
+        assessments = [
+            self._precheck_function(n) if n.type == MetaDataTypes.FUNCTION_TYPE else None
+            for n in nodes
+        ]
+        requests = {}
+        keys = {}
+
+        for i, node in enumerate(nodes):
+            if assessments[i] is not None:
+                continue
+
+            if node.type == MetaDataTypes.CLASS_TYPE:
+                request = self._class_request(node)
+            else:
+                request = self._function_request(node)
+
+            keys[i], assessments[i] = self._cache_lookup(request)
+
+            if assessments[i] is None:
+                requests[i] = request
+
+        return assessments, requests, keys
+
+    def _packed_request(self, requests: Dict[int, dict]):
+        prompt = "\n".join(
+            f'<function id="node-{i}">\n{request["prompt"]}\n</function>'
+            for i, request in requests.items()
+        )
+
+        return dict(
+            instructions=self.function_prompt + PACKED_FUNCTIONS_PROMPT,
+            prompt=prompt,
+            output_structure=packed_output(self.function_output),
+        )
+
+    def _unpack(self, response: str, assessments: List, requests: Dict[int, dict], keys: Dict):
+        """Moves every valid assessment in a packed response out of `requests`"""
+        packed = self._parse(response, packed_output(self.function_output))
+
+        if packed is None:
+            return
+
+        for item in packed.assessments:
+            i = item.node_id.removeprefix("node-")
+
+            if not i.isdigit() or int(i) not in requests:
+                continue
+
+            assessment = self.function_output.model_validate(
+                item.model_dump(exclude={"node_id"})
+            )
+
+            assessments[int(i)] = assessment
+            self._cache_store(keys[int(i)], assessment)
+            del requests[int(i)]
+
+    def _cache_lookup(self, request: dict):
+        if self.cache is None:
+            return None, None
+
+        key = self.cache.make_key(self.connection, **request)
+        cached = self.cache.get(key)
+
+        if cached is None:
+            return key, None
+
+        return key, request["output_structure"].model_validate_json(cached)
+
+    def _cache_store(self, key: str, assessment):
+        if key is not None:
+            self.cache.put(key, assessment.model_dump_json())
+
+    def _precheck_function(self, function: FunctionMetadata):
+        if self.prevalidator is None:
+            return None
+
+        return self.prevalidator.assess_function(function, self.function_output)
+
+    def _function_request(self, function: FunctionMetadata):
+        source = function.source_code
+
+        if self.slimmer is not None:
+            source = self.slimmer.slim(source).text
+
+        return dict(
+            instructions=self.function_prompt,
+            prompt=source,
+            output_structure=self.function_output,
+        )
+
+    def _class_request(self, cls: ClassMetadata):
+        # a class without its own __init__ is sent with an empty constructor
+        source = "" if cls.constructor is None else cls.constructor.source_code
         docstring = cls.docstring
 
         prompt = (
@@ -46,19 +497,23 @@ class ValidationAgent:
             f"<constructor>{source}</constructor>\n"
         )
 
-        response = self.connection.prompt(
+        return dict(
             instructions=self.class_prompt,
             prompt=prompt,
             output_structure=self.class_output,
         )
 
+    def _parse(self, response: str, output_structure):
+        """Validates a response, repairing it if needed, None if it is unusable"""
+        try:
+            return output_structure.model_validate_json(response)
+        except ValidationError:
+            pass
+
         try:
-            cda = self.class_output.model_validate_json(response)
-        except Exception as e:
-            print(response)
-            raise e
-        
-        return ValidationResults(cls, cda)
+            return output_structure.model_validate_json(repair_json(response))
+        except ValidationError:
+            return None
     
     @property
     def function_prompt(self):
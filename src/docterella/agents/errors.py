@@ -0,0 +1,20 @@
+from docterella.connections.usage import Usage
+
+class InvalidResponseError(Exception):
+    """Raised when no valid response was received for a node
+
+    Parameters
+    ----------
+    message: str
+        Description of the error
+
+    response: str
+        The last response returned by the model
+
+    usage: Usage
+        Tokens and timing of every attempt at the request
+    """
+    def __init__(self, message: str, response: str = None, usage: Usage = None):
+        super().__init__(message)
+        self.response = response
+        self.usage = usage
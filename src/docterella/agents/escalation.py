@@ -0,0 +1,128 @@
+import threading
+
+from pydantic import BaseModel
+from typing import TYPE_CHECKING
+from typing import Optional
+
+from docterella.agents.prevalidator import Prevalidator
+from docterella.pydantic.metadata import MetaDataTypes
+
+if TYPE_CHECKING:
+    from docterella.agents.base import ValidationAgent
+
+# assessment flags the prevalidator can decide locally
+_PRECHECK_FLAGS = (
+    "parameter_names_are_correct",
+    "parameter_types_are_correct",
+    "return_type_is_correct",
+)
+
+class EscalationPolicy:
+    """Decides which results of a fast model are validated again by a stronger one
+
+    An agent with an escalation policy sends every node to its own, cheap,
+    connection first. The node is validated again by the policy's agent
+    when the assessment raises any flag, when no valid response could be
+    obtained, or when it contradicts the local pre-check of the signature.
+
+    Parameters
+    ----------
+    agent: ValidationAgent
+        The agent used for escalated nodes, typically with a stronger
+        connection or a reasoning configuration
+
+    on_flags: bool
+        Escalate assessments with any flag set to False
+
+    on_failure: bool
+        Escalate nodes for which the fast model gave no valid response
+
+    on_disagreement: bool
+        Escalate function assessments that contradict the prevalidator's
+        comparison of the docstring with the signature
+
+    prevalidator: Prevalidator
+        Used to check for disagreements, a default one is created when omitted
+    """
+    def __init__(
+        self,
+        agent: "ValidationAgent",
+        on_flags: bool = True,
+        on_failure: bool = True,
+        on_disagreement: bool = True,
+        prevalidator: Prevalidator = None,
+    ):
+        if prevalidator is None:
+            prevalidator = Prevalidator()
+
+        self.agent = agent
+        self.on_flags = on_flags
+        self.on_failure = on_failure
+        self.on_disagreement = on_disagreement
+        self.prevalidator = prevalidator
+
+        self.checked = 0
+        self.escalated = 0
+
+        self._lock = threading.Lock()
+
+    def should_escalate(self, node, assessment: Optional[BaseModel]) -> bool:
+        """Checks a fast model's assessment, None if it gave no valid response"""
+        if assessment is None:
+            escalate = self.on_failure
+        else:
+            escalate = (
+                (self.on_flags and self._has_false_flag(assessment.model_dump()))
+                or (self.on_disagreement and self._disagrees(node, assessment))
+            )
+
+        with self._lock:
+            self.checked += 1
+
+            if escalate:
+                self.escalated += 1
+
+        return escalate
+
+    def validate(self, node):
+        if node.type == MetaDataTypes.CLASS_TYPE:
+            return self.agent.validate_class(node)
+
+        return self.agent.validate_function(node)
+
+    async def avalidate(self, node):
+        if node.type == MetaDataTypes.CLASS_TYPE:
+            return await self.agent.avalidate_class(node)
+
+        return await self.agent.avalidate_function(node)
+
+    def _has_false_flag(self, value) -> bool:
+        if value is False:
+            return True
+
+        if isinstance(value, dict):
+            return any(self._has_false_flag(v) for v in value.values())
+
+        if isinstance(value, list):
+            return any(self._has_false_flag(v) for v in value)
+
+        return False
+
+    def _disagrees(self, node, assessment: BaseModel) -> bool:
+        if node.type != MetaDataTypes.FUNCTION_TYPE:
+            return False
+
+        result = self.prevalidator.check_function(node)
+
+        if result is None:
+            return False
+
+        for flag in _PRECHECK_FLAGS:
+            expected = getattr(result, flag)
+            actual = getattr(assessment, flag, None)
+
+            # flags the prevalidator could not decide are left to the model
+            if expected is not None and actual is not None and expected != actual:
+                return True
+
+        return False
@@ -0,0 +1,230 @@
+import ast
+import re
+import threading
+
+from pydantic import BaseModel
+from typing import List
+from typing import Optional
+
+from docterella.docstrings.parsing import parser_for
+from docterella.pydantic.components import FunctionDocstring
+from docterella.pydantic.metadata import FunctionMetadata
+
+_GENERIC_ALIASES = {
+    "List": "list",
+    "Dict": "dict",
+    "Tuple": "tuple",
+    "Set": "set",
+    "FrozenSet": "frozenset",
+    "Type": "type",
+}
+
+class PrecheckResult:
+    """Outcome of comparing a function's docstring against its signature
+
+    The flags are None when they cannot be decided locally, for example when
+    a parameter has no type annotation.
+    """
+    def __init__(
+        self,
+        docstring: FunctionDocstring,
+        signature_parameters: List[str],
+        parameter_types_are_correct: Optional[bool],
+        return_type_is_correct: Optional[bool],
+    ):
+        self.docstring = docstring
+        self.signature_parameters = signature_parameters
+        self.docstring_parameters = [
+            a.name.lstrip("*") for a in docstring.correct_function_arguments
+        ]
+        self.missing_params_from_docstring = [
+            p for p in signature_parameters if p not in self.docstring_parameters
+        ]
+        self.extra_params_in_docstring = [
+            p for p in self.docstring_parameters if p not in signature_parameters
+        ]
+        self.parameter_names_are_correct = (
+            self.docstring_parameters == signature_parameters
+        )
+        self.parameter_types_are_correct = parameter_types_are_correct
+        self.return_type_is_correct = return_type_is_correct
+
+    def has_descriptions(self, min_words: int = 1) -> bool:
+        """Checks every description has at least `min_words` words"""
+        descriptions = [self.docstring.correct_function_description] + [
+            c.description for c in (
+                self.docstring.correct_function_arguments
+                + self.docstring.correct_function_return_values
+            )
+        ]
+
+        return all(len(d.split()) >= min_words for d in descriptions)
+
+    def is_consistent(self, min_description_words: int = 1) -> bool:
+        return (
+            self.parameter_names_are_correct
+            and self.parameter_types_are_correct is True
+            and self.return_type_is_correct is True
+            and self.has_descriptions(min_description_words)
+        )
+
+
+class Prevalidator:
+    """Checks function docstrings against their signature without the model
+
+    Functions whose Google or NumPy style docstring documents exactly the
+    parameters, parameter types and return type of the signature are given
+    an assessment locally. Every other function is left for the model.
+
+    Parameters
+    ----------
+    min_description_words: int
+        Descriptions shorter than this are considered in need of review by
+        the model, since their accuracy cannot be checked locally
+    """
+    def __init__(self, min_description_words: int = 3):
+        self.min_description_words = min_description_words
+        self.checked = 0
+        self.passed = 0
+        self._lock = threading.Lock()
+
+    def check_function(self, function: FunctionMetadata) -> Optional[PrecheckResult]:
+        """Compares the docstring with the signature, None if there is no docstring"""
+        try:
+            node = ast.parse(function.source_code).body[0]
+        except SyntaxError:
+            return None
+
+        docstring = ast.get_docstring(node)
+
+        if not docstring:
+            return None
+
+        parsed = parser_for(docstring).parse_function(docstring)
+        parameters = self._signature_parameters(node)
+
+        return PrecheckResult(
+            docstring=parsed,
+            signature_parameters=[name for name, _ in parameters],
+            parameter_types_are_correct=self._check_parameter_types(parameters, parsed),
+            return_type_is_correct=self._check_return_type(node, parsed),
+        )
+
+    def assess_function(self, function: FunctionMetadata, output_structure: BaseModel):
+        """Returns an assessment when the docstring is provably consistent"""
+        result = self.check_function(function)
+        consistent = result is not None and result.is_consistent(self.min_description_words)
+
+        with self._lock:
+            self.checked += 1
+
+            if consistent:
+                self.passed += 1
+
+        if not consistent:
+            return None
+
+        assessment = {
+            "summary_of_findings": (
+                "The docstring documents every parameter, parameter type and "
+                "the return type of the signature."
+            ),
+            "parameter_names_are_correct": True,
+            "parameter_types_are_correct": True,
+            "parameter_descriptions_are_correct": True,
+            "return_type_is_correct": True,
+            "corrected_function_docstring": result.docstring.model_dump(),
+        }
+
+        if "reasoning" in output_structure.model_fields:
+            assessment["reasoning"] = {
+                "signature_parameters": result.signature_parameters,
+                "docstring_parameters": result.docstring_parameters,
+                "missing_params_from_docstring": [],
+                "extra_params_in_docstring": [],
+                "incorrect_param_descriptions": [],
+                "return_type_matches": True,
+            }
+
+        return output_structure.model_validate(assessment)
+
+    @staticmethod
+    def _signature_parameters(node: ast.FunctionDef):
+        args = node.args
+        positional = args.posonlyargs + args.args
+
+        if positional and positional[0].arg in ("self", "cls"):
+            positional = positional[1:]
+
+        parameters = positional[:]
+
+        if args.vararg:
+            parameters.append(args.vararg)
+
+        parameters += args.kwonlyargs
+
+        if args.kwarg:
+            parameters.append(args.kwarg)
+
+        return [
+            (p.arg, None if p.annotation is None else ast.unparse(p.annotation))
+            for p in parameters
+        ]
+
+    def _check_parameter_types(self, parameters, docstring: FunctionDocstring):
+        documented = {
+            a.name.lstrip("*"): a.data_type for a in docstring.correct_function_arguments
+        }
+
+        for name, annotation in parameters:
+            if name not in documented:
+                continue
+
+            if annotation is None:
+                return None
+
+            if self._normalize_type(annotation) != self._normalize_type(documented[name]):
+                return False
+
+        return True
+
+    def _check_return_type(self, node: ast.FunctionDef, docstring: FunctionDocstring):
+        documented = docstring.correct_function_return_values
+
+        if node.returns is None:
+            if self._returns_value(node):
+                return None
+
+            return not documented
+
+        annotation = ast.unparse(node.returns)
+
+        if annotation == "None":
+            return not documented
+
+        if len(documented) != 1:
+            return False
+
+        return self._normalize_type(annotation) == self._normalize_type(documented[0].data_type)
+
+    @staticmethod
+    def _returns_value(node: ast.FunctionDef) -> bool:
+        for child in ast.walk(node):
+            if isinstance(child, (ast.Yield, ast.YieldFrom)):
+                return True
+
+            if isinstance(child, ast.Return) and child.value is not None:
+                return True
+
+        return False
+
+    @staticmethod
+    def _normalize_type(data_type: str) -> str:
+        data_type = re.sub(r",\s*optional$", "", data_type.strip())
+        data_type = re.sub(r"\s+", "", data_type).replace("typing.", "")
+        data_type = data_type.replace("'", "").replace('"', "")
+
+        for alias, builtin in _GENERIC_ALIASES.items():
+            data_type = re.sub(rf"\b{alias}\b", builtin, data_type)
+
+        return data_type
@@ -0,0 +1,163 @@
+import json
+import re
+
+_CODE_FENCE = re.compile(r"^\s*```[\w-]*\s*\n?(.*?)\n?\s*(```\s*)?$", re.DOTALL)
+_DUPLICATE_BRACE = re.compile(r"^\{\s*(?=\{)")
+
+def repair_json(response: str) -> str:
+    """Attempts to turn a malformed model response into parseable JSON
+
+    Handles the common ways structured output goes wrong: markdown code
+    fences, text around the JSON object, the `{` prefilled by
+    `AnthropicConnection` being repeated by the model, trailing commas and
+    responses truncated part way through. The result is not guaranteed to
+    be valid JSON or to match the output schema, so it still needs to be
+    validated.
+
+    Examples
+    --------
+    >>> repair_json('{"a": "x"')
+    '{"a": "x"}'
+    >>> repair_json('{"a": ["x", "y"')
+    '{"a": ["x", "y"]}'
+    >>> repair_json('{"a": "x", "b": tr')
+    '{"a": "x"}'
+    """
+    text = response.strip()
+
+    match = _CODE_FENCE.match(text)
+    if match:
+        text = match.group(1).strip()
+
+    text = _DUPLICATE_BRACE.sub("", text)
+
+    start = text.find("{")
+    if start > 0:
+        text = text[start:]
+
+    text, commas = _strip_trailing_commas(text)
+
+    # a truncated response is cut back to the last complete member if
+    # closing the open brackets is not enough
+    for cut in [len(text)] + commas[::-1][:20]:
+        candidate = _close(text[:cut])
+
+        try:
+            json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+
+        return candidate
+
+    return text
+
+
+def _scan(text: str):
+    """Yields each character with whether a string literal is open after it
+
+    An opening quote is reported inside its string and a closing quote
+    outside it, so the state after the last character tells whether the
+    text ends part way through a string.
+    """
+    in_string = False
+    escape = False
+
+    for i, char in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+
+        yield i, char, in_string
+
+
+def _strip_trailing_commas(text: str):
+    output = []
+    commas = []
+    pending_comma = None
+
+    for i, char, in_string in _scan(text):
+        if not in_string and char in "}]" and pending_comma is not None:
+            output[pending_comma] = ""
+            pending_comma = None
+        elif not in_string and char == ",":
+            pending_comma = len(output)
+            commas.append(len(output))
+        elif in_string or not char.isspace():
+            pending_comma = None
+
+        output.append(char)
+
+    text = "".join(output)
+
+    # positions shift by one for every comma removed before them
+    positions = []
+    removed = 0
+    for position in commas:
+        if output[position] == "":
+            removed += 1
+            continue
+
+        positions.append(position - removed)
+
+    # anything after a complete top level object is commentary
+    end = _object_end(text)
+    if end is not None:
+        text = text[:end]
+        positions = [p for p in positions if p < end]
+
+    return text, positions
+
+
+def _object_end(text: str):
+    depth = 0
+
+    for i, char, in_string in _scan(text):
+        if in_string:
+            continue
+
+        if char in "{[":
+            depth += 1
+        elif char in "}]":
+            depth -= 1
+
+            if depth == 0:
+                return i + 1
+
+    return None
+
+
+def _close(text: str) -> str:
+    stack = []
+    in_string = False
+
+    for _, char, in_string in _scan(text):
+        if in_string:
+            continue
+
+        if char == "{":
+            stack.append("}")
+        elif char == "[":
+            stack.append("]")
+        elif char in "}]" and stack and stack[-1] == char:
+            stack.pop()
+
+    if in_string:
+        if text.endswith("\\") and not text.endswith("\\\\"):
+            text = text[:-1]
+
+        text += '"'
+
+    text = text.rstrip()
+
+    if text.endswith(","):
+        text = text[:-1]
+    elif text.endswith(":"):
+        text += " null"
+
+    return text + "".join(reversed(stack))
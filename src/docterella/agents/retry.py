@@ -0,0 +1,64 @@
+import random
+
+from typing import Tuple
+from typing import Type
+
+from docterella.connections.errors import CircuitOpenError
+from docterella.connections.errors import RateLimitError
+from docterella.connections.errors import RequestTimeoutError
+from docterella.connections.errors import TransientError
+
+class RetryPolicy:
+    """Controls how often and how quickly a failed node is retried
+
+    Transport errors are retried after a jittered exponential backoff. A
+    response that cannot be validated, even after repair, is re-prompted
+    immediately. Both count towards `max_attempts`.
+
+    Parameters
+    ----------
+    max_attempts: int
+        Maximum number of requests sent to the model for a single node
+
+    base_delay: float
+        Backoff in seconds before the first retry of a transport error
+
+    max_delay: float
+        Upper bound on the backoff between two attempts
+
+    retry_on: Tuple[Type[Exception]]
+        Exceptions raised by the connection that are worth retrying. By
+        default only connection errors, server errors and throttling, any
+        other error is raised straight away
+
+    give_up_on: Tuple[Type[Exception]]
+        Exceptions that are never retried, even when they match `retry_on`.
+        By default a request that timed out, or was refused by an open
+        circuit breaker, fails straight away
+    """
+    def __init__(
+        self,
+        max_attempts: int = 4,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        retry_on: Tuple[Type[Exception], ...] = (TransientError, ConnectionError),
+        give_up_on: Tuple[Type[Exception], ...] = (RequestTimeoutError, CircuitOpenError),
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on = retry_on
+        self.give_up_on = give_up_on
+
+    def should_retry(self, attempt: int, error: Exception) -> bool:
+        """Checks whether another attempt follows the given failed attempt"""
+        return attempt + 1 < self.max_attempts and not isinstance(error, self.give_up_on)
+
+    def delay(self, attempt: int, error: Exception = None) -> float:
+        """Seconds to wait before retrying after the given failed attempt"""
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+        if isinstance(error, RateLimitError) and error.retry_after:
+            return max(backoff, error.retry_after)
+
+        return backoff
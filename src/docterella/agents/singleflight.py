@@ -0,0 +1,84 @@
+import asyncio
+import threading
+
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import Tuple
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces identical requests that are in flight at the same time
+
+    The first caller for a key runs the request while later callers for
+    the same key wait for, and share, its outcome. Keys are forgotten as
+    soon as their request completes, so this only removes concurrent
+    duplicates; use a `ResultCache` to reuse results afterwards.
+    """
+    def __init__(self):
+        self.requests = 0
+        self.shared = 0
+
+        self._calls: Dict[str, _Call] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable) -> Tuple[object, bool]:
+        """Runs `fn` unless a call for `key` is in flight, returning its result
+        and whether it was shared with another caller"""
+        with self._lock:
+            self.requests += 1
+            call = self._calls.get(key)
+            leader = call is None
+
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+
+            if call.error is not None:
+                raise call.error
+
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+            call.done.set()
+
+        return call.result, False
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable]) -> Tuple[object, bool]:
+        """Asynchronous counterpart of `do`, `fn` returns the awaitable to run"""
+        with self._lock:
+            self.requests += 1
+            task = self._tasks.get(key)
+            leader = task is None
+
+            if leader:
+                task = self._tasks[key] = asyncio.ensure_future(fn())
+                task.add_done_callback(lambda _: self._forget(key))
+            else:
+                self.shared += 1
+
+        # shielded so one cancelled caller does not cancel the request for the rest
+        return await asyncio.shield(task), not leader
+
+    def _forget(self, key: str):
+        with self._lock:
+            del self._tasks[key]
@@ -0,0 +1,184 @@
+import ast
+import threading
+
+from docterella.tokens import estimate_tokens
+
+_COMPOUND_FIELDS = ("body", "orelse", "finalbody", "handlers", "cases")
+_NESTED_SCOPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)
+
+class SlimmedSource:
+    """Source code after slimming along with the size of what was removed"""
+    def __init__(self, text: str, original_tokens: int, slimmed_tokens: int, elided_lines: int):
+        self.text = text
+        self.original_tokens = original_tokens
+        self.slimmed_tokens = slimmed_tokens
+        self.elided_lines = elided_lines
+
+    @property
+    def trimmed_tokens(self) -> int:
+        return self.original_tokens - self.slimmed_tokens
+
+
+class SourceSlimmer:
+    """Shrinks large functions before they are sent to the model
+
+    Only the parts of a function that a docstring describes are kept: the
+    decorators and signature, the docstring, and every `return`, `yield` and
+    `raise` statement together with the headers of the blocks that enclose
+    them. Every other run of lines is replaced by a single marker comment.
+    Functions within the token budget are sent unchanged.
+
+    Parameters
+    ----------
+    token_budget: int
+        Functions estimated to be larger than this many tokens are slimmed
+
+    context_lines: int
+        Number of lines kept above each return, yield and raise statement
+    """
+    def __init__(self, token_budget: int = 1500, context_lines: int = 0):
+        self.token_budget = token_budget
+        self.context_lines = context_lines
+
+        self.slimmed = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self._lock = threading.Lock()
+
+    @property
+    def trimmed_tokens(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+    def slim(self, source: str) -> SlimmedSource:
+        tokens = estimate_tokens(source)
+
+        if tokens <= self.token_budget:
+            return SlimmedSource(source, tokens, tokens, 0)
+
+        try:
+            node = ast.parse(source).body[0]
+        except (SyntaxError, IndexError):
+            return SlimmedSource(source, tokens, tokens, 0)
+
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            return SlimmedSource(source, tokens, tokens, 0)
+
+        lines = source.splitlines()
+        text, elided = self._render(lines, self._kept_lines(node, lines))
+        slimmed_tokens = estimate_tokens(text)
+
+        with self._lock:
+            self.slimmed += 1
+            self.tokens_before += tokens
+            self.tokens_after += slimmed_tokens
+
+        return SlimmedSource(text, tokens, slimmed_tokens, elided)
+
+    def _kept_lines(self, node: ast.FunctionDef, lines):
+        kept = set(range(1, node.body[0].lineno))
+
+        docstring = node.body[0]
+        if isinstance(docstring, ast.Expr) and isinstance(docstring.value, ast.Constant):
+            kept.update(range(docstring.lineno, docstring.end_lineno + 1))
+
+        for statement, path in self._exit_statements(node, []):
+            start = max(1, statement.lineno - self.context_lines)
+            kept.update(range(start, statement.end_lineno + 1))
+
+            for parent, field in path[1:]:
+                kept.update(self._header_lines(parent, field, lines))
+
+        return kept
+
+    def _exit_statements(self, node: ast.AST, path):
+        """Finds the statements that return, yield or raise
+
+        Each statement is paired with the path of (parent, block field) pairs
+        leading to it from the function, so the enclosing headers can be kept.
+        """
+        for field in _COMPOUND_FIELDS:
+            for child in getattr(node, field, None) or []:
+                if isinstance(child, _NESTED_SCOPES):
+                    continue
+
+                child_path = path + [(node, field)]
+
+                if self._exits(child):
+                    yield child, child_path
+                else:
+                    yield from self._exit_statements(child, child_path)
+
+    @staticmethod
+    def _exits(statement: ast.AST) -> bool:
+        if isinstance(statement, (ast.Return, ast.Raise)):
+            return True
+
+        if any(getattr(statement, field, None) for field in _COMPOUND_FIELDS):
+            return False
+
+        return any(
+            isinstance(n, (ast.Yield, ast.YieldFrom)) for n in ast.walk(statement)
+        )
+
+    def _header_lines(self, parent: ast.AST, field: str, lines):
+        if isinstance(parent, ast.Match):
+            body_start = parent.cases[0].pattern.lineno
+        else:
+            body_start = parent.body[0].lineno
+
+        header = set(range(self._start_line(parent), body_start))
+
+        if field in ("orelse", "finalbody"):
+            # the `else:` and `finally:` lines are not part of the ast
+            lineno = getattr(parent, field)[0].lineno - 1
+
+            while lineno > 0 and (
+                not lines[lineno - 1].strip() or lines[lineno - 1].strip().startswith("#")
+            ):
+                lineno -= 1
+
+            if lineno > 0 and lines[lineno - 1].strip().startswith(("else", "finally")):
+                header.add(lineno)
+
+        return header
+
+    @staticmethod
+    def _start_line(node: ast.AST) -> int:
+        if isinstance(node, ast.match_case):
+            return node.pattern.lineno
+
+        return node.lineno
+
+    def _render(self, lines, kept):
+        output = []
+        elided = 0
+        run = []
+
+        for lineno, line in enumerate(lines + [None], start=1):
+            if lineno in kept or line is None:
+                if run:
+                    marker = self._marker(run)
+
+                    # short runs are cheaper to send than to replace
+                    if estimate_tokens("\n".join(run)) <= estimate_tokens(marker):
+                        output.extend(run)
+                    else:
+                        output.append(marker)
+                        elided += len(run)
+
+                    run = []
+
+                if line is not None:
+                    output.append(line)
+            else:
+                run.append(line)
+
+        return "\n".join(output), elided
+
+    @staticmethod
+    def _marker(run) -> str:
+        first_line = next((line for line in run if line.strip()), run[0])
+        indent = first_line[:len(first_line) - len(first_line.lstrip())]
+        noun = "line" if len(run) == 1 else "lines"
+
+        return f"{indent}...  # {len(run)} {noun} elided"
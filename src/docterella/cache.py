@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from pydantic import BaseModel
+from typing import Dict
+from typing import Optional
+
+from docterella.connections.base_connection import BaseConnection
+
+class ResultCache:
+    """Persistent cache of model assessments stored in a SQLite database
+
+    Entries are keyed on a hash of everything that influences the model's
+    answer: the node source sent as the prompt, the instructions, the output
+    schema and the connection's model and options. The least recently used
+    entries are evicted once the cache grows past its limits. The database
+    uses write-ahead logging so several processes can share one cache file.
+
+    Parameters
+    ----------
+    path: str
+        Location of the SQLite database file. It is created if missing
+
+    max_entries: int
+        Maximum number of entries kept in the cache
+
+    max_bytes: int
+        Optional limit on the total size of the stored assessments
+    """
+    def __init__(self, path: str, max_entries: int = 100_000, max_bytes: int = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access)"
+        )
+
+    @staticmethod
+    def make_key(
+        connection: BaseConnection,
+        instructions: str,
+        prompt: str,
+        output_structure: BaseModel,
+    ) -> str:
+        """Builds the cache key for a request to the given connection"""
+        content = json.dumps(
+            [
+                connection.identity(),
+                instructions,
+                output_structure.model_json_schema(),
+                prompt,
+            ],
+            sort_keys=True,
+            default=str,
+        )
+
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM results WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._db.execute(
+                "UPDATE results SET last_access = ? WHERE key = ?",
+                (time.time(), key),
+            )
+
+        return row[0]
+
+    def put(self, key: str, value: str):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (key, value, size, last_access)"
+                    " VALUES (?, ?, ?, ?)",
+                    (key, value, len(value.encode("utf-8")), time.time()),
+                )
+                self._evict()
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+            ).fetchone()
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _evict(self):
+        self._db.execute(
+            "DELETE FROM results WHERE key IN ("
+            " SELECT key FROM results ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+        if self.max_bytes is None:
+            return
+
+        (size,) = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM results"
+        ).fetchone()
+
+        rows = self._db.execute(
+            "SELECT key, size FROM results ORDER BY last_access"
+        )
+
+        expired = []
+        for key, entry_size in rows:
+            if size <= self.max_bytes:
+                break
+
+            expired.append((key,))
+            size -= entry_size
+
+        self._db.executemany("DELETE FROM results WHERE key = ?", expired)
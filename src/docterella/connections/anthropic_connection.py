@@ -1,24 +1,142 @@
 import anthropic
 import os
+import time
 
+from contextlib import contextmanager
 from pydantic import BaseModel
-from docterella.connections.base_connection import BaseConnection
+from docterella.connections.batch_connection import BatchConnection
+from docterella.connections.errors import RateLimitError
+from docterella.connections.errors import RequestTimeoutError
+from docterella.connections.errors import TransientError
+from docterella.connections.errors import parse_retry_after
+from docterella.connections.usage import Completion
+from docterella.connections.usage import Usage
 from typing import Dict
+from typing import Optional
 
-class AnthropicConnection(BaseConnection):
-    """Interface for connecting with Anthropics models"""
-    def __init__(self, model, options: Dict = None):
+# 529 is returned when the api is overloaded
+_THROTTLE_STATUS = (429, 529)
+
+class AnthropicConnection(BatchConnection):
+    """Interface for connecting with Anthropics models
+
+    Parameters
+    ----------
+    model: str
+        Name of the model to use
+
+    options: Dict
+        Model options such as the temperature
+
+    base_url: str
+        Address of the api, defaults to the Anthropic api. Useful for
+        proxies and local stand-in servers
+
+    timeout: float
+        Seconds to wait for a response before the request is abandoned,
+        defaults to the client's own timeout
+    """
+    def __init__(
+        self, model, options: Dict = None, base_url: str = None, timeout: float = None
+    ):
         self.model = model
         
         if options is None:
-            self.options = {"temperature": 0}
+            options = {"temperature": 0}
+
+        self.options = options
+        self.base_url = base_url
+        self.timeout = timeout
+
+        self.client = anthropic.Anthropic(**self._client_params())
+
+    def complete(
+        self, instructions: str, prompt: str, output_structure: BaseModel
+    ) -> Completion:
+        start = time.monotonic()
+
+        with self._translate_errors():
+            message = self.client.messages.create(
+                **self._request_params(instructions, prompt, output_structure)
+            )
+
+        return self._completion(message, time.monotonic() - start)
+
+    async def acomplete(
+        self, instructions: str, prompt: str, output_structure: BaseModel
+    ) -> Completion:
+        start = time.monotonic()
+
+        with self._translate_errors():
+            message = await self.async_client.messages.create(
+                **self._request_params(instructions, prompt, output_structure)
+            )
+
+        return self._completion(message, time.monotonic() - start)
+
+    def _create_async_client(self):
+        return anthropic.AsyncAnthropic(**self._client_params())
+
+    def submit_batch(self, requests: Dict[str, Dict]) -> str:
+        with self._translate_errors():
+            batch = self.client.messages.batches.create(
+                requests=[
+                    {"custom_id": custom_id, "params": self._request_params(**request)}
+                    for custom_id, request in requests.items()
+                ]
+            )
 
-        self.client = anthropic.Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+        return batch.id
 
-    def prompt(self, instructions: str, prompt: str, output_structure: BaseModel):
+    def batch_done(self, batch_id: str) -> bool:
+        with self._translate_errors():
+            batch = self.client.messages.batches.retrieve(batch_id)
+
+        return batch.processing_status == "ended"
+
+    def batch_results(self, batch_id: str) -> Dict[str, Completion]:
+        responses = {}
+
+        with self._translate_errors():
+            for entry in self.client.messages.batches.results(batch_id):
+                if entry.result.type == "succeeded":
+                    # the time spent queued in a batch is not a latency
+                    responses[entry.custom_id] = self._completion(entry.result.message, None)
+
+        return responses
+
+    def _client_params(self) -> Dict:
+        return dict(
+            api_key=os.environ.get("ANTHROPIC_API_KEY"),
+            base_url=self.base_url,
+            timeout=anthropic.NOT_GIVEN if self.timeout is None else self.timeout,
+        )
+
+    @contextmanager
+    def _translate_errors(self):
+        try:
+            yield
+        except anthropic.APITimeoutError as e:
+            raise RequestTimeoutError(str(e)) from e
+        except anthropic.APIConnectionError as e:
+            raise TransientError(str(e)) from e
+        except anthropic.APIStatusError as e:
+            if e.status_code in _THROTTLE_STATUS:
+                raise RateLimitError(
+                    str(e), parse_retry_after(e.response.headers)
+                ) from e
+
+            if e.status_code >= 500:
+                raise TransientError(str(e)) from e
+
+            raise
+
+    def _request_params(
+        self, instructions: str, prompt: str, output_structure: BaseModel
+    ) -> Dict:
         format = output_structure.model_json_schema()
 
-        message = self.client.messages.create(
+        return dict(
             model=self.model,
             max_tokens=1000,
             system=[
@@ -45,6 +163,22 @@ class AnthropicConnection(BaseConnection):
             ]
         )
 
-        result = "{" + message.content[0].text
-        
-        return result
+    def _completion(self, message, latency: Optional[float]) -> Completion:
+        usage = message.usage
+        cache_creation = usage.cache_creation_input_tokens or 0
+        cache_read = usage.cache_read_input_tokens or 0
+
+        # the api counts cached prompt tokens separately from input_tokens
+        return Completion(
+            self._response_text(message),
+            Usage(
+                input_tokens=usage.input_tokens + cache_creation + cache_read,
+                output_tokens=usage.output_tokens,
+                cache_creation_tokens=cache_creation,
+                cache_read_tokens=cache_read,
+                latency=latency,
+            ),
+        )
+
+    def _response_text(self, message) -> str:
+        return "{" + message.content[0].text
@@ -1,13 +1,29 @@
-from abc import ABC, abstractmethod
+import asyncio
+import time
+
+from abc import ABC
 from pydantic import BaseModel
+from typing import Dict
+
+from docterella.connections.usage import Completion
+from docterella.connections.usage import Usage
 
 class BaseConnection(ABC):
-    """Interface for connections to an LLM api (e.g., Ollama)"""
-    @abstractmethod
+    """Interface for connections to an LLM api (e.g., Ollama)
+
+    Connections implement either `prompt` or `complete`, along with their
+    async counterparts when their client has them, and the base class
+    derives the rest from them.
+    """
+    # set by `async_client` the first time it is used
+    _async_client = None
+
     def prompt(
         self, instructions: str, prompt: str, output_structure: BaseModel
     ) -> str:
         """Sends a request to the model and returns the response
+
+        The default implementation returns the text of `complete`.
         
         Parameters
         ----------
@@ -23,4 +39,97 @@ class BaseConnection(ABC):
             A Pydantic class that specifies the expected format and typing for
             the response
         """
+        if not self._overrides("complete"):
+            raise NotImplementedError(
+                f"{type(self).__name__} must implement prompt or complete"
+            )
+
+        return self.complete(instructions, prompt, output_structure).text
+
+    async def aprompt(
+        self, instructions: str, prompt: str, output_structure: BaseModel
+    ) -> str:
+        """Asynchronous counterpart of `prompt`
+
+        Connections backed by an async client should override this or
+        `acomplete`. Otherwise `prompt` runs in a worker thread so that every
+        connection can be awaited.
+        """
+        if self._overrides("acomplete"):
+            return (await self.acomplete(instructions, prompt, output_structure)).text
+
+        return await asyncio.to_thread(
+            self.prompt, instructions, prompt, output_structure
+        )
+
+    def complete(
+        self, instructions: str, prompt: str, output_structure: BaseModel
+    ) -> Completion:
+        """Sends a request like `prompt` and returns the response with its usage
+
+        Connections whose api reports token counts should override this
+        instead of `prompt`. The default implementation only measures the
+        latency.
+        """
+        start = time.monotonic()
+        text = self.prompt(instructions, prompt, output_structure)
+
+        return Completion(text, Usage(latency=time.monotonic() - start))
+
+    async def acomplete(
+        self, instructions: str, prompt: str, output_structure: BaseModel
+    ) -> Completion:
+        """Asynchronous counterpart of `complete`"""
+        # keep the usage a synchronous `complete` reports
+        if self._overrides("complete") and not self._overrides("aprompt"):
+            return await asyncio.to_thread(
+                self.complete, instructions, prompt, output_structure
+            )
+
+        start = time.monotonic()
+        text = await self.aprompt(instructions, prompt, output_structure)
+
+        return Completion(text, Usage(latency=time.monotonic() - start))
+
+    @property
+    def async_client(self):
+        """The client used by the async requests, see `_create_async_client`"""
+        # created lazily so the connection can be built outside an event loop
+        if self._async_client is None:
+            self._async_client = self._create_async_client()
+
+        return self._async_client
+
+    def _create_async_client(self):
+        """Creates the api's async client, for connections that have one"""
+        return None
+
+    def _overrides(self, name: str) -> bool:
+        return getattr(type(self), name) is not getattr(BaseConnection, name)
+
+    def identity(self) -> Dict:
+        """Describes the model behind the connection
+
+        Used to key cached and deduplicated requests, so it should include
+        every setting that changes the model's response.
+        """
+        return {
+            "connection": type(self).__name__,
+            "model": getattr(self, "model", None),
+            "options": getattr(self, "options", None),
+        }
+
+    def warm_up(self, instructions: str = None):
+        """Prepares the model before the first request of a run
+
+        Connections to models that are loaded on demand should override this
+        so that the load is not paid for by the first validated node. Hosted
+        apis have nothing to prepare.
+
+        Parameters
+        ----------
+        instructions: str
+            The instructions that will be sent with every request, for
+            connections that can evaluate them ahead of time
+        """
         pass
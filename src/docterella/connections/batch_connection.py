@@ -0,0 +1,38 @@
+from abc import abstractmethod
+from typing import Dict
+
+from docterella.connections.base_connection import BaseConnection
+from docterella.connections.usage import Completion
+
+class BatchConnection(BaseConnection):
+    """Interface for connections whose api can also process requests in bulk
+
+    Batches are processed asynchronously by the provider, usually at a lower
+    price than individual requests. A batch is submitted once, polled with
+    `batch_done` and its responses collected with `batch_results`.
+    """
+    @abstractmethod
+    def submit_batch(self, requests: Dict[str, Dict]) -> str:
+        """Submits several requests as a single batch and returns its id
+
+        Parameters
+        ----------
+        requests: Dict[str, Dict]
+            The keyword arguments of `prompt` for each request, keyed by a
+            custom id made of letters, digits, underscores and dashes
+        """
+        pass
+
+    @abstractmethod
+    def batch_done(self, batch_id: str) -> bool:
+        """Checks whether the provider has finished processing a batch"""
+        pass
+
+    @abstractmethod
+    def batch_results(self, batch_id: str) -> Dict[str, Completion]:
+        """Returns the completion of every successful request in a batch
+
+        Requests that failed or expired are left out, keyed by the custom
+        ids given to `submit_batch`.
+        """
+        pass
@@ -0,0 +1,225 @@
+import threading
+import time
+
+from collections import deque
+from pydantic import BaseModel
+from typing import Dict
+from typing import Optional
+
+from docterella.connections.base_connection import BaseConnection
+from docterella.connections.errors import CircuitOpenError
+from docterella.connections.errors import RateLimitError
+from docterella.connections.usage import Completion
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """Tracks the error rate of a connection and stops requests once it is too high
+
+    The breaker is closed while the share of failures among the last
+    `window` requests stays below `failure_threshold`. Once it is crossed
+    the breaker opens and refuses every request for `reset_timeout`
+    seconds, then lets a single trial request through. The breaker closes
+    again if the trial succeeds and reopens if it fails. Requests sent
+    before the breaker opened that complete while it is half open do not
+    decide the trial.
+
+    Parameters
+    ----------
+    failure_threshold: float
+        Share of failed requests at which the breaker opens
+
+    window: int
+        Number of recent requests the error rate is measured over
+
+    min_requests: int
+        Requests needed in the window before the breaker can open. The
+        default matches the attempts of the default `RetryPolicy`, so a
+        backend that fails every attempt at a node opens the breaker
+
+    reset_timeout: float
+        Seconds the breaker stays open before a trial request
+    """
+    def __init__(
+        self,
+        failure_threshold: float = 0.5,
+        window: int = 20,
+        min_requests: int = 4,
+        reset_timeout: float = 30.0,
+    ):
+        self.failure_threshold = failure_threshold
+        self.min_requests = min_requests
+        self.reset_timeout = reset_timeout
+
+        self.state = CLOSED
+        self.opened = 0
+        self.refused = 0
+
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> Optional[str]:
+        """Checks whether a request may be sent
+
+        Returns
+        -------
+        Optional[str]
+            None when the request is refused, otherwise the state it was
+            admitted in, to pass to `record` or `cancel`. A request admitted
+            while half open is the trial
+        """
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+
+            if self.state == CLOSED:
+                return CLOSED
+
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return HALF_OPEN
+
+            self.refused += 1
+
+            return None
+
+    def record(self, success: bool, admitted: str):
+        """Records the outcome of a request admitted in the state `admitted`"""
+        with self._lock:
+            if admitted == HALF_OPEN:
+                self._trial_in_flight = False
+
+                if success:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._open()
+
+                return
+
+            # only the trial decides whether a half open breaker closes
+            if self.state == HALF_OPEN:
+                return
+
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+
+            if (
+                self.state == CLOSED
+                and len(self._outcomes) >= self.min_requests
+                and failures / len(self._outcomes) >= self.failure_threshold
+            ):
+                self._open()
+
+    def cancel(self, admitted: str):
+        """Forgets a request that was abandoned before it completed"""
+        with self._lock:
+            if admitted == HALF_OPEN:
+                self._trial_in_flight = False
+
+    def _open(self):
+        self.state = OPEN
+        self.opened += 1
+        self._opened_at = time.monotonic()
+
+
+class CircuitBreakerConnection(BaseConnection):
+    """Wraps a connection so requests stop being sent to it while it keeps failing
+
+    While the breaker is open, requests go to `fallback` when one is given
+    and otherwise fail straight away with a `CircuitOpenError`. Throttling
+    errors are not counted as failures since the rate limiter handles them.
+
+    Parameters
+    ----------
+    connection: BaseConnection
+        The connection requests are sent through
+
+    breaker: CircuitBreaker
+        The breaker to use, a default breaker is created when omitted
+
+    fallback: BaseConnection
+        Optional connection used while the breaker is open
+    """
+    def __init__(
+        self,
+        connection: BaseConnection,
+        breaker: CircuitBreaker = None,
+        fallback: BaseConnection = None,
+    ):
+        if breaker is None:
+            breaker = CircuitBreaker()
+
+        self.connection = connection
+        self.breaker = breaker
+        self.fallback = fallback
+
+    def complete(
+        self, instructions: str, prompt: str, output_structure: BaseModel
+    ) -> Completion:
+        admitted = self.breaker.allow()
+
+        if admitted is None:
+            if self.fallback is None:
+                raise CircuitOpenError(f"The circuit of {self._name()} is open")
+
+            return self.fallback.complete(instructions, prompt, output_structure)
+
+        try:
+            result = self.connection.complete(instructions, prompt, output_structure)
+        except RateLimitError:
+            self.breaker.record(True, admitted)
+            raise
+        except Exception:
+            self.breaker.record(False, admitted)
+            raise
+        except BaseException:
+            self.breaker.cancel(admitted)
+            raise
+
+        self.breaker.record(True, admitted)
+
+        return result
+
+    async def acomplete(
+        self, instructions: str, prompt: str, output_structure: BaseModel
+    ) -> Completion:
+        admitted = self.breaker.allow()
+
+        if admitted is None:
+            if self.fallback is None:
+                raise CircuitOpenError(f"The circuit of {self._name()} is open")
+
+            return await self.fallback.acomplete(instructions, prompt, output_structure)
+
+        try:
+            result = await self.connection.acomplete(instructions, prompt, output_structure)
+        except RateLimitError:
+            self.breaker.record(True, admitted)
+            raise
+        except Exception:
+            self.breaker.record(False, admitted)
+            raise
+        except BaseException:
+            # a cancelled request says nothing about the connection's health
+            self.breaker.cancel(admitted)
+            raise
+
+        self.breaker.record(True, admitted)
+
+        return result
+
+    def identity(self) -> Dict:
+        return self.connection.identity()
+
+    def warm_up(self, instructions: str = None):
+        self.connection.warm_up(instructions)
+
+    def _name(self) -> str:
+        identity = self.connection.identity()
+
+        return f"{identity['connection']} ({identity['model']})"
@@ -0,0 +1,58 @@
+from typing import Mapping
+from typing import Optional
+
+class TransientError(Exception):
+    """Raised when a request failed for a reason that may pass on its own
+
+    Connections translate their client's connection errors and server
+    errors (HTTP 5xx) into this exception, so they can be retried without
+    retrying errors such as a rejected api key or a bug in the caller.
+    """
+    pass
+
+
+class RateLimitError(TransientError):
+    """Raised when a provider rejects a request because of its rate limits
+
+    Connections translate their client's throttling errors (HTTP 429, an
+    overloaded provider or a full Ollama queue) into this exception so rate
+    limiting can be handled the same way for every provider.
+
+    Parameters
+    ----------
+    message: str
+        Description of the error
+
+    retry_after: float
+        Seconds the provider asked to wait before retrying, if it said
+    """
+    def __init__(self, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(headers: Optional[Mapping]) -> Optional[float]:
+    """Reads the number of seconds from a `retry-after` response header"""
+    if not headers:
+        return None
+
+    value = headers.get("retry-after")
+
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class RequestTimeoutError(TimeoutError):
+    """Raised when a request to the model does not complete within its timeout
+
+    Connections translate their client's timeout errors into this exception
+    so a run can skip the node instead of stalling or aborting.
+    """
+    pass
+
+
+class CircuitOpenError(Exception):
+    """Raised without contacting the model while a circuit breaker is open"""
+    pass
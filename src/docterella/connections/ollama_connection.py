@@ -1,29 +1,185 @@
+import httpx
 import ollama
+import time
 
+from contextlib import contextmanager
 from pydantic import BaseModel
 from docterella.connections.base_connection import BaseConnection
+from docterella.connections.errors import RateLimitError
+from docterella.connections.errors import RequestTimeoutError
+from docterella.connections.errors import TransientError
+from docterella.connections.usage import Completion
+from docterella.connections.usage import Usage
 from typing import Dict
+from typing import Union
+
+# 503 is returned when the server's request queue is full
+_THROTTLE_STATUS = (429, 503)
 
 class OllamaConnection(BaseConnection):
-    """Interface for connecting to a model running via Ollama"""
-    def __init__(self, model: str, options: Dict = None):
+    """Interface for connecting to a model running via Ollama
+
+    Requests use the chat api with the instructions as the system message.
+    The instructions are identical for every node, so Ollama can reuse the
+    evaluated prefix from its KV cache and only evaluate the code, provided
+    the model stays loaded and the context holds the whole conversation.
+
+    Parameters
+    ----------
+    model: str
+        Name of the model to use
+
+    options: Dict
+        Model options such as the temperature
+
+    keep_alive: Union[float, str]
+        How long Ollama keeps the model, and its cached prefix, loaded
+        after a request
+
+    num_ctx: int
+        Context window size. Ollama's default is smaller than the longer
+        prompts, and a truncated context cannot reuse the cached prefix
+
+    host: str
+        Address of the Ollama server, defaults to OLLAMA_HOST or the local
+        server
+
+    timeout: float
+        Seconds to wait for a response, long enough for a model to load.
+        None waits indefinitely, which also keeps a run from ending at
+        its deadline until the request completes
+    """
+    def __init__(
+        self,
+        model: str,
+        options: Dict = None,
+        keep_alive: Union[float, str] = "30m",
+        num_ctx: int = None,
+        host: str = None,
+        timeout: float = 300.0,
+    ):
         self.model = model
         
         if options is None:
-            self.options = {"temperature": 0}
+            options = {"temperature": 0}
+
+        if num_ctx is not None:
+            options = {**options, "num_ctx": num_ctx}
+
+        self.options = options
+        self.keep_alive = keep_alive
+        self.host = host
+        self.timeout = timeout
+
+        # one client for the life of the connection, so its http connections
+        # are pooled rather than opened for every request
+        self.client = ollama.Client(host=host, timeout=timeout)
 
-    def prompt(
-        self, 
+    def complete(
+        self,
         instructions: str,
-        prompt: str, 
+        prompt: str,
         output_structure: BaseModel,
-    ):
+    ) -> Completion:
+        start = time.monotonic()
+
+        with self._translate_errors():
+            result = self.client.chat(
+                **self._request_params(instructions, prompt, output_structure)
+            )
+
+        return self._completion(result, time.monotonic() - start)
+
+    async def acomplete(
+        self,
+        instructions: str,
+        prompt: str,
+        output_structure: BaseModel,
+    ) -> Completion:
+        start = time.monotonic()
+
+        with self._translate_errors():
+            result = await self.async_client.chat(
+                **self._request_params(instructions, prompt, output_structure)
+            )
+
+        return self._completion(result, time.monotonic() - start)
+
+    def _create_async_client(self):
+        return ollama.AsyncClient(host=self.host, timeout=self.timeout)
+
+    def warm_up(self, instructions: str = None):
+        """Loads the model, and evaluates the instructions when they are given
+
+        Only a single token is generated, so the call costs little more than
+        the load and leaves the instruction prefix in the KV cache.
+        """
+        # the options must match the requests', a different num_ctx reloads the model
+        with self._translate_errors():
+            if instructions is None:
+                self.client.generate(
+                    model=self.model, options=self.options, keep_alive=self.keep_alive
+                )
+            else:
+                self.client.chat(
+                    model=self.model,
+                    messages=[{"role": "system", "content": instructions}],
+                    options={**self.options, "num_predict": 1},
+                    keep_alive=self.keep_alive,
+                )
+
+    def unload(self):
+        """Releases the model from the server's memory"""
+        with self._translate_errors():
+            self.client.generate(model=self.model, keep_alive=0)
+
+    @contextmanager
+    def _translate_errors(self):
+        try:
+            yield
+        except httpx.TimeoutException as e:
+            raise RequestTimeoutError(str(e)) from e
+        except (httpx.TransportError, ConnectionError) as e:
+            # the client reports a refused connection as a ConnectionError
+            raise TransientError(str(e)) from e
+        except ollama.ResponseError as e:
+            if e.status_code in _THROTTLE_STATUS:
+                raise RateLimitError(str(e)) from e
+
+            if e.status_code >= 500:
+                raise TransientError(str(e)) from e
+
+            raise
+
+    def _request_params(
+        self, instructions: str, prompt: str, output_structure: BaseModel
+    ) -> Dict:
+        # the system message must come first and stay byte-identical between
+        # requests for the cached prefix to be reused
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": instructions},
+                {"role": "user", "content": f"<code>{prompt}</code>"},
+            ],
+            "format": output_structure.model_json_schema(),
+            "options": self.options,
+            "keep_alive": self.keep_alive,
+        }
+
+    @staticmethod
+    def _completion(result, latency: float) -> Completion:
+        # durations are reported in nanoseconds, and are missing from some
+        # responses, such as those of a model that is still loading
+        def seconds(name):
+            return (result.get(name) or 0) / 1e9
 
-        result = ollama.generate(
-            model=self.model, 
-            prompt=f"{instructions}<code>{prompt}</code>", 
-            format=output_structure.model_json_schema(), 
-            options=self.options
+        usage = Usage(
+            input_tokens=result.get("prompt_eval_count") or 0,
+            output_tokens=result.get("eval_count") or 0,
+            latency=latency,
+            time_to_first_token=seconds("load_duration") + seconds("prompt_eval_duration"),
+            generation_time=seconds("eval_duration") or None,
         )
 
-        return result['response']
+        return Completion(result['message']['content'], usage)
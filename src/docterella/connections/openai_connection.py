@@ -1,25 +1,277 @@
+import json
 import os
+import time
+from contextlib import contextmanager
+from openai import APIConnectionError
+from openai import APIStatusError
+from openai import APITimeoutError
+from openai import AsyncOpenAI
+from openai import NOT_GIVEN
 from openai import OpenAI
 from pydantic import BaseModel
 from typing import Dict
-from docterella.connections.base_connection import BaseConnection
+from typing import Optional
+from docterella.connections.batch_connection import BatchConnection
+from docterella.connections.errors import RateLimitError
+from docterella.connections.errors import RequestTimeoutError
+from docterella.connections.errors import TransientError
+from docterella.connections.errors import parse_retry_after
+from docterella.connections.usage import Completion
+from docterella.connections.usage import Usage
 
-class OpenaiConnection(BaseConnection):
-    """Interface for connection to OpenAi models"""
-    def __init__(self, model, options: Dict = None):
+# batches that will not make any more progress
+_BATCH_FINISHED = ("completed", "failed", "expired", "cancelled")
+
+def _strict_schema(schema: Dict, root: Dict) -> Dict:
+    """Adapts a pydantic JSON schema, in place, to OpenAI's strict structured outputs
+
+    Every object closes its properties and requires all of them, null
+    defaults are dropped and references with sibling keys are inlined.
+    """
+    for definition in schema.get("$defs", {}).values():
+        _strict_schema(definition, root)
+
+    if schema.get("type") == "object":
+        schema.setdefault("additionalProperties", False)
+
+    if "properties" in schema:
+        schema["required"] = list(schema["properties"])
+
+        for value in schema["properties"].values():
+            _strict_schema(value, root)
+
+    if isinstance(schema.get("items"), dict):
+        _strict_schema(schema["items"], root)
+
+    for key in ("anyOf", "allOf"):
+        for variant in schema.get(key, []):
+            _strict_schema(variant, root)
+
+    if len(schema.get("allOf", [])) == 1:
+        schema.update(schema.pop("allOf")[0])
+
+    if "default" in schema and schema["default"] is None:
+        del schema["default"]
+
+    if "$ref" in schema and len(schema) > 1:
+        resolved = root
+
+        for part in schema.pop("$ref").removeprefix("#/").split("/"):
+            resolved = resolved[part]
+
+        schema.update({**resolved, **schema})
+        _strict_schema(schema, root)
+
+    return schema
+
+class OpenaiConnection(BatchConnection):
+    """Interface for connection to OpenAi models
+
+    Parameters
+    ----------
+    model: str
+        Name of the model to use
+
+    options: Dict
+        Model options such as the temperature
+
+    base_url: str
+        Address of the api, defaults to the OpenAI api. Useful for proxies
+        and local stand-in servers
+
+    timeout: float
+        Seconds to wait for a response before the request is abandoned,
+        defaults to the client's own timeout
+    """
+    def __init__(
+        self, model, options: Dict = None, base_url: str = None, timeout: float = None
+    ):
         self.model = model
 
         if options is None:
-            self.options = {"temperature": 0}
+            options = {"temperature": 0}
+
+        self.options = options
+        self.base_url = base_url
+        self.timeout = timeout
+
+        self.client = OpenAI(**self._client_params())
+
+    def complete(
+        self, instructions: str, prompt: str, output_structure: BaseModel
+    ) -> Completion:
+        start = time.monotonic()
+
+        with self._translate_errors():
+            message = self.client.responses.parse(
+                **self._request_params(instructions, prompt, output_structure)
+            )
+
+        return self._completion(message, time.monotonic() - start)
+
+    async def acomplete(
+        self, instructions: str, prompt: str, output_structure: BaseModel
+    ) -> Completion:
+        start = time.monotonic()
+
+        with self._translate_errors():
+            message = await self.async_client.responses.parse(
+                **self._request_params(instructions, prompt, output_structure)
+            )
+
+        return self._completion(message, time.monotonic() - start)
+
+    def _create_async_client(self):
+        return AsyncOpenAI(**self._client_params())
+
+    def submit_batch(self, requests: Dict[str, Dict]) -> str:
+        lines = [
+            json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/responses",
+                "body": self._batch_body(**request),
+            })
+            for custom_id, request in requests.items()
+        ]
+
+        with self._translate_errors():
+            file = self.client.files.create(
+                file=("batch.jsonl", "\n".join(lines).encode("utf-8")), purpose="batch"
+            )
+            batch = self.client.batches.create(
+                input_file_id=file.id,
+                endpoint="/v1/responses",
+                completion_window="24h",
+            )
+
+        return batch.id
 
-        self.client = OpenAI()
+    def batch_done(self, batch_id: str) -> bool:
+        with self._translate_errors():
+            batch = self.client.batches.retrieve(batch_id)
 
-    def prompt(self, instructions: str, prompt: str, output_structure: BaseModel):
-        message = self.client.responses.parse(
+        return batch.status in _BATCH_FINISHED
+
+    def batch_results(self, batch_id: str) -> Dict[str, Completion]:
+        responses = {}
+
+        with self._translate_errors():
+            batch = self.client.batches.retrieve(batch_id)
+
+            # expired batches still have an output file for the finished requests
+            if batch.output_file_id is None:
+                return responses
+
+            content = self.client.files.content(batch.output_file_id).text
+
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+
+            entry = json.loads(line)
+            response = entry.get("response")
+
+            if not response or response.get("status_code") != 200:
+                continue
+
+            body = response["body"]
+            text = self._output_text(body)
+
+            if text is not None:
+                # the time spent queued in a batch is not a latency
+                responses[entry["custom_id"]] = Completion(
+                    text, self._usage(body.get("usage"), None)
+                )
+
+        return responses
+
+    def _client_params(self) -> Dict:
+        return dict(
+            base_url=self.base_url,
+            timeout=NOT_GIVEN if self.timeout is None else self.timeout,
+        )
+
+    @contextmanager
+    def _translate_errors(self):
+        try:
+            yield
+        except APITimeoutError as e:
+            raise RequestTimeoutError(str(e)) from e
+        except APIConnectionError as e:
+            raise TransientError(str(e)) from e
+        except APIStatusError as e:
+            if e.status_code == 429:
+                raise RateLimitError(
+                    str(e), parse_retry_after(e.response.headers)
+                ) from e
+
+            if e.status_code >= 500:
+                raise TransientError(str(e)) from e
+
+            raise
+
+    def _request_params(
+        self, instructions: str, prompt: str, output_structure: BaseModel
+    ) -> Dict:
+        return dict(
             model=self.model,
             instructions=instructions,
             input=prompt, 
             text_format=output_structure,
         )
 
-        return message.output_parsed.model_dump_json()
+    def _batch_body(
+        self, instructions: str, prompt: str, output_structure: BaseModel
+    ) -> Dict:
+        # batch bodies are sent as raw json, so the schema is converted the same
+        # way `responses.parse` converts `text_format`
+        schema = output_structure.model_json_schema()
+
+        return dict(
+            model=self.model,
+            instructions=instructions,
+            input=prompt,
+            text={
+                "format": {
+                    "type": "json_schema",
+                    "name": output_structure.__name__,
+                    "schema": _strict_schema(schema, schema),
+                    "strict": True,
+                }
+            },
+        )
+
+    def _completion(self, message, latency: Optional[float]) -> Completion:
+        usage = None if message.usage is None else message.usage.model_dump()
+
+        return Completion(
+            message.output_parsed.model_dump_json(), self._usage(usage, latency)
+        )
+
+    @staticmethod
+    def _usage(usage: Optional[Dict], latency: Optional[float]) -> Usage:
+        if not usage:
+            return Usage(latency=latency)
+
+        # input_tokens already include the cached ones
+        details = usage.get("input_tokens_details") or {}
+
+        return Usage(
+            input_tokens=usage.get("input_tokens") or 0,
+            output_tokens=usage.get("output_tokens") or 0,
+            cache_read_tokens=details.get("cached_tokens") or 0,
+            latency=latency,
+        )
+
+    @staticmethod
+    def _output_text(body: Dict) -> Optional[str]:
+        for item in body.get("output", []):
+            if item.get("type") != "message":
+                continue
+
+            for content in item.get("content", []):
+                if content.get("type") == "output_text":
+                    return content["text"]
+
+        return None
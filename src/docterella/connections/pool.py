@@ -0,0 +1,487 @@
+import asyncio
+import math
+import threading
+import time
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from pydantic import BaseModel
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Union
+
+from docterella.connections.base_connection import BaseConnection
+from docterella.connections.usage import Completion
+
+LEAST_OUTSTANDING = "least_outstanding"
+LATENCY_WEIGHTED = "latency_weighted"
+
+HEALTH_INSTRUCTIONS = "You are a health check. Reply with ok set to true."
+
+class HealthCheck(BaseModel):
+    """Smallest structured response, used to probe an ejected backend"""
+    ok: bool
+
+class Backend:
+    """Routing state the pool keeps for one of its connections
+
+    Parameters
+    ----------
+    connection: BaseConnection
+        The connection requests are sent through
+
+    max_in_flight: int
+        Maximum number of requests sent to this backend at the same time
+    """
+    def __init__(self, connection: BaseConnection, max_in_flight: int):
+        self.connection = connection
+        self.max_in_flight = max_in_flight
+
+        self.in_flight = 0
+        self.latency: Optional[float] = None
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.ejections = 0
+        self.requests = 0
+        self.failures = 0
+
+    def is_ejected(self, now: float) -> bool:
+        return now < self.ejected_until
+
+    def has_capacity(self) -> bool:
+        return self.in_flight < self.max_in_flight
+
+    def cost(self, routing: str) -> float:
+        """Expected wait for a new request, lower is better"""
+        if routing == LEAST_OUTSTANDING:
+            return self.in_flight / self.max_in_flight
+
+        # backends without a measurement are tried first so they get one
+        if self.latency is None:
+            return 0.0
+
+        return (self.in_flight + 1) * self.latency
+
+
+class LatencyTracker:
+    """Latencies of the most recent requests, used to estimate quantiles
+
+    Parameters
+    ----------
+    window: int
+        Number of recent latencies kept
+
+    min_samples: int
+        Latencies needed before a quantile is estimated
+    """
+    def __init__(self, window: int = 500, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, latency: float):
+        with self._lock:
+            self._latencies.append(latency)
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+
+            latencies = sorted(self._latencies)
+
+        return latencies[min(len(latencies) - 1, math.ceil(q * len(latencies)) - 1)]
+
+
+class PooledConnection(BaseConnection):
+    """Spreads requests over several connections to the same model
+
+    Each request goes to the backend with spare capacity and the lowest
+    cost: the fewest outstanding requests relative to its cap, or with
+    latency weighted routing the lowest outstanding requests times its
+    average latency. A request that fails is retried on another backend.
+    A backend that fails `max_failures` times in a row is ejected for
+    `ejection_time` seconds, doubling on every ejection in a row, after
+    which the next request routed to it acts as a health check.
+
+    With hedging enabled, a request still running after the
+    `hedge_quantile` of recent latencies is duplicated on another backend
+    and the first response wins. In async code the slower request is
+    cancelled; a thread cannot be interrupted, so in sync code its result
+    is discarded when it arrives. Hedges are limited to `hedge_budget` of
+    all requests, so a slow pool is not flooded with duplicates.
+
+    All the backends should serve the same model with the same options,
+    since cached results are keyed by the first backend's identity.
+
+    Parameters
+    ----------
+    connections: List[BaseConnection]
+        The backend connections, for example one per Ollama host
+
+    max_in_flight: Union[int, List[int]]
+        Concurrency cap of every backend, or of each backend in order
+
+    routing: str
+        Either "least_outstanding" or "latency_weighted"
+
+    max_failures: int
+        Consecutive failures after which a backend is ejected
+
+    ejection_time: float
+        Seconds a backend is ejected for the first time
+
+    max_ejection_time: float
+        Upper limit on the ejection time of a repeatedly failing backend
+
+    latency_decay: float
+        Weight of the newest latency in each backend's moving average
+
+    hedge_budget: float
+        Highest fraction of requests that may be hedged, 0 disables hedging
+
+    hedge_quantile: float
+        Quantile of recent latencies after which a request is hedged
+
+    latency_tracker: LatencyTracker
+        Tracks the latencies the hedge delay is estimated from, a default
+        tracker is created when omitted
+    """
+    def __init__(
+        self,
+        connections: List[BaseConnection],
+        max_in_flight: Union[int, List[int]] = 4,
+        routing: str = LEAST_OUTSTANDING,
+        max_failures: int = 3,
+        ejection_time: float = 30.0,
+        max_ejection_time: float = 600.0,
+        latency_decay: float = 0.2,
+        hedge_budget: float = 0.0,
+        hedge_quantile: float = 0.95,
+        latency_tracker: LatencyTracker = None,
+    ):
+        if not connections:
+            raise ValueError("A pool needs at least one connection")
+
+        if routing not in (LEAST_OUTSTANDING, LATENCY_WEIGHTED):
+            raise ValueError(f"The routing {routing} is unknown")
+
+        if isinstance(max_in_flight, int):
+            max_in_flight = [max_in_flight] * len(connections)
+
+        if len(max_in_flight) != len(connections):
+            raise ValueError("max_in_flight must have one cap per connection")
+
+        self.backends = [Backend(c, m) for c, m in zip(connections, max_in_flight)]
+        self.routing = routing
+        self.max_failures = max_failures
+        self.ejection_time = ejection_time
+        self.max_ejection_time = max_ejection_time
+        self.latency_decay = latency_decay
+        self.hedge_budget = hedge_budget
+        self.hedge_quantile = hedge_quantile
+        self.latencies = latency_tracker or LatencyTracker()
+
+        self.requests = 0
+        self.hedges = 0
+        self.hedges_won = 0
+
+        self._condition = threading.Condition()
+        self._executor = None
+
+    def complete(
+        self, instructions: str, prompt: str, output_structure: BaseModel
+    ) -> Completion:
+        args = (instructions, prompt, output_structure)
+        tried = []
+
+        while True:
+            backend = self._acquire(tried)
+
+            try:
+                return self._hedged_call(backend, args)
+            except Exception:
+                tried.append(backend)
+
+                if len(tried) == len(self.backends):
+                    raise
+
+    async def acomplete(
+        self, instructions: str, prompt: str, output_structure: BaseModel
+    ) -> Completion:
+        args = (instructions, prompt, output_structure)
+        tried = []
+
+        while True:
+            backend = await self._aacquire(tried)
+
+            try:
+                return await self._ahedged_call(backend, args)
+            except Exception:
+                tried.append(backend)
+
+                if len(tried) == len(self.backends):
+                    raise
+
+    def identity(self) -> Dict:
+        return self.backends[0].connection.identity()
+
+    def warm_up(self, instructions: str = None):
+        """Warms up every backend at the same time"""
+        with ThreadPoolExecutor(max_workers=len(self.backends)) as executor:
+            list(executor.map(
+                lambda b: b.connection.warm_up(instructions), self.backends
+            ))
+
+    def close(self):
+        """Shuts down the threads running hedged requests"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def check_health(self):
+        """Probes every ejected backend and readmits those that answer
+
+        The probe is a real completion with a one field response, since a
+        warm up does nothing for hosted apis and would readmit a backend
+        that is still failing.
+        """
+        for backend in self.backends:
+            if not backend.is_ejected(time.monotonic()):
+                continue
+
+            try:
+                backend.connection.complete(HEALTH_INSTRUCTIONS, "ok?", HealthCheck)
+            except Exception:
+                continue
+
+            with self._condition:
+                backend.ejected_until = 0.0
+                backend.consecutive_failures = 0
+                self._condition.notify_all()
+
+    def _hedged_call(self, backend: Backend, args):
+        delay = self._hedge_delay()
+
+        if delay is None:
+            return self._call(backend, args)
+
+        primary = self.executor.submit(self._call, backend, args)
+        wait([primary], timeout=delay)
+
+        hedge_backend = None if primary.done() else self._acquire_hedge(backend)
+
+        if hedge_backend is None:
+            return primary.result()
+
+        hedge = self.executor.submit(self._call, hedge_backend, args)
+        pending = {primary, hedge}
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._condition:
+                            self.hedges_won += 1
+
+                    return future.result()
+
+        return primary.result()
+
+    async def _ahedged_call(self, backend: Backend, args):
+        delay = self._hedge_delay()
+
+        if delay is None:
+            return await self._acall(backend, args)
+
+        primary = asyncio.ensure_future(self._acall(backend, args))
+        pending = {primary}
+
+        try:
+            await asyncio.wait(pending, timeout=delay)
+
+            hedge_backend = None if primary.done() else self._acquire_hedge(backend)
+
+            if hedge_backend is None:
+                return await primary
+
+            hedge = asyncio.ensure_future(self._acall(hedge_backend, args))
+            pending.add(hedge)
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            with self._condition:
+                                self.hedges_won += 1
+
+                        return task.result()
+
+            return await primary
+        finally:
+            # cancelling the slower request frees its backend straight away
+            for task in pending:
+                task.cancel()
+
+    def _call(self, backend: Backend, args):
+        start = time.monotonic()
+
+        try:
+            result = backend.connection.complete(*args)
+        except Exception:
+            self._release(backend, time.monotonic() - start, failed=True)
+            raise
+        except BaseException:
+            self._release(backend, time.monotonic() - start)
+            raise
+
+        self._release(backend, time.monotonic() - start, succeeded=True)
+
+        return result
+
+    async def _acall(self, backend: Backend, args):
+        start = time.monotonic()
+
+        try:
+            result = await backend.connection.acomplete(*args)
+        except Exception:
+            self._release(backend, time.monotonic() - start, failed=True)
+            raise
+        except BaseException:
+            self._release(backend, time.monotonic() - start)
+            raise
+
+        self._release(backend, time.monotonic() - start, succeeded=True)
+
+        return result
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        # every call holds a backend slot, so the caps bound the threads needed
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=sum(b.max_in_flight for b in self.backends)
+            )
+
+        return self._executor
+
+    def _hedge_delay(self) -> Optional[float]:
+        if self.hedge_budget <= 0 or len(self.backends) < 2:
+            return None
+
+        return self.latencies.quantile(self.hedge_quantile)
+
+    def _acquire_hedge(self, primary: Backend) -> Optional[Backend]:
+        """Reserves a second backend for a hedge, None if it is not allowed or not free"""
+        with self._condition:
+            if self.hedges + 1 > self.hedge_budget * self.requests:
+                return None
+
+            backend = self._select([primary])
+
+            if backend is None or backend.is_ejected(time.monotonic()):
+                return None
+
+            backend.in_flight += 1
+            self.hedges += 1
+
+            return backend
+
+    def stats(self) -> List[Dict]:
+        return [
+            {
+                "identity": b.connection.identity(),
+                "requests": b.requests,
+                "failures": b.failures,
+                "ejections": b.ejections,
+                "latency": b.latency,
+                "in_flight": b.in_flight,
+            }
+            for b in self.backends
+        ]
+
+    def _acquire(self, tried: List[Backend]) -> Backend:
+        with self._condition:
+            while True:
+                backend = self._select(tried)
+
+                if backend is not None:
+                    backend.in_flight += 1
+                    self.requests += 1
+                    return backend
+
+                self._condition.wait(timeout=1.0)
+
+    async def _aacquire(self, tried: List[Backend]) -> Backend:
+        while True:
+            with self._condition:
+                backend = self._select(tried)
+
+                if backend is not None:
+                    backend.in_flight += 1
+                    self.requests += 1
+                    return backend
+
+            await asyncio.sleep(0.05)
+
+    def _select(self, tried: List[Backend]) -> Optional[Backend]:
+        now = time.monotonic()
+        candidates = [b for b in self.backends if b not in tried]
+        healthy = [b for b in candidates if not b.is_ejected(now)]
+
+        # with every backend ejected, keep trying rather than stall the run
+        if healthy:
+            candidates = healthy
+
+        candidates = [b for b in candidates if b.has_capacity()]
+
+        if not candidates:
+            return None
+
+        return min(candidates, key=lambda b: b.cost(self.routing))
+
+    def _release(
+        self, backend: Backend, latency: float, failed: bool = False, succeeded: bool = False
+    ):
+        """Frees a backend slot, recording the outcome of a completed request"""
+        with self._condition:
+            backend.in_flight -= 1
+
+            if failed:
+                backend.requests += 1
+                backend.failures += 1
+                backend.consecutive_failures += 1
+
+                if backend.consecutive_failures >= self.max_failures:
+                    self._eject(backend)
+            elif succeeded:
+                backend.requests += 1
+                self.latencies.add(latency)
+
+                # a success ends the run of ejections
+                backend.consecutive_failures = 0
+                backend.ejections = 0
+
+                if backend.latency is None:
+                    backend.latency = latency
+                else:
+                    backend.latency += self.latency_decay * (latency - backend.latency)
+
+            self._condition.notify_all()
+
+    def _eject(self, backend: Backend):
+        duration = min(
+            self.max_ejection_time, self.ejection_time * 2 ** backend.ejections
+        )
+
+        backend.ejections += 1
+        # one more failure after readmission ejects the backend again
+        backend.consecutive_failures = self.max_failures - 1
+        backend.ejected_until = time.monotonic() + duration
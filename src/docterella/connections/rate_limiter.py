@@ -0,0 +1,325 @@
+import asyncio
+import json
+import random
+import threading
+import time
+
+from pydantic import BaseModel
+from typing import Dict
+from typing import Optional
+
+from docterella.connections.base_connection import BaseConnection
+from docterella.connections.errors import RateLimitError
+from docterella.connections.usage import Completion
+from docterella.tokens import estimate_tokens
+
+class TokenBucket:
+    """Token bucket refilled continuously at a per-minute rate
+
+    Reservations are taken immediately and may leave the bucket in debt,
+    the caller then waits for the returned number of seconds. This lets the
+    same bucket serve threads and coroutines.
+    """
+    def __init__(self, per_minute: float, capacity: float = None):
+        if capacity is None:
+            capacity = per_minute
+
+        self.rate = per_minute / 60
+        self.capacity = capacity
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float) -> float:
+        """Takes `amount` from the bucket and returns the seconds to wait"""
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+        self.level -= min(amount, self.capacity)
+
+        if self.level >= 0:
+            return 0.0
+
+        return -self.level / self.rate
+
+
+class AdaptiveRateLimiter:
+    """Limits request rate, token rate and concurrency towards one provider
+
+    Requests and tokens per minute are enforced with token buckets. The
+    number of concurrent requests follows additive-increase /
+    multiplicative-decrease: every successful request raises the limit by
+    roughly one per round of requests, while a throttling error, another
+    failure or a latency above `target_latency` cuts it by
+    `decrease_factor`. Cancelled requests leave it unchanged. A `retry-after`
+    returned by the provider pauses all new requests for that long, and a
+    throttling error without one, such as Ollama's 503, pauses them for a
+    jittered exponential backoff.
+
+    Parameters
+    ----------
+    requests_per_minute: float
+        Optional limit on the number of requests started per minute
+
+    tokens_per_minute: float
+        Optional limit on the estimated tokens sent per minute
+
+    initial_concurrency: int
+        Number of concurrent requests allowed at the start
+
+    min_concurrency: int
+        Lowest concurrency the limit is decreased to
+
+    max_concurrency: int
+        Highest concurrency the limit is increased to
+
+    target_latency: float
+        Optional latency in seconds above which concurrency is decreased,
+        used to back off before an Ollama server's queue saturates
+
+    decrease_factor: float
+        Factor applied to the concurrency limit on each decrease
+
+    base_backoff: float
+        Pause in seconds after a first throttling error without a
+        `retry-after`, doubled on each consecutive one
+
+    max_backoff: float
+        Upper bound on that pause
+    """
+    def __init__(
+        self,
+        requests_per_minute: float = None,
+        tokens_per_minute: float = None,
+        initial_concurrency: int = 4,
+        min_concurrency: int = 1,
+        max_concurrency: int = 64,
+        target_latency: float = None,
+        decrease_factor: float = 0.5,
+        base_backoff: float = 1.0,
+        max_backoff: float = 30.0,
+    ):
+        self.requests = None if requests_per_minute is None else TokenBucket(requests_per_minute)
+        self.tokens = None if tokens_per_minute is None else TokenBucket(tokens_per_minute)
+
+        self.limit = float(initial_concurrency)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+        self.decrease_factor = decrease_factor
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self.in_flight = 0
+        self.throttled = 0
+        self.paused_until = 0.0
+        self._consecutive_throttles = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+        # futures of coroutines waiting for a slot, with the loop each runs in
+        self._async_waiters = []
+
+    @property
+    def concurrency(self) -> int:
+        return max(self.min_concurrency, int(self.limit))
+
+    def acquire(self, tokens: int = 0):
+        # the rate wait comes first so it does not hold a concurrency slot
+        with self._condition:
+            wait = self._reserve(tokens)
+
+        if wait > 0:
+            time.sleep(wait)
+
+        with self._condition:
+            while self.in_flight >= self.concurrency:
+                self._condition.wait()
+
+            self.in_flight += 1
+
+    async def aacquire(self, tokens: int = 0):
+        with self._condition:
+            wait = self._reserve(tokens)
+
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+        loop = asyncio.get_running_loop()
+
+        while True:
+            with self._condition:
+                if self.in_flight < self.concurrency:
+                    self.in_flight += 1
+                    return
+
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+
+            await waiter
+
+    def release(
+        self,
+        latency: float,
+        error: Optional[RateLimitError] = None,
+        failed: bool = False,
+        succeeded: bool = False,
+    ):
+        """Frees a request slot, adjusting the limit to the request's outcome
+
+        A request that was neither throttled, failed nor succeeded, such as
+        a cancelled one, says nothing about the provider's load.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+
+            if error is not None:
+                self.throttled += 1
+                self._consecutive_throttles += 1
+                self._decrease(now, latency)
+                self.paused_until = max(self.paused_until, now + self._pause(error))
+            elif failed:
+                # an overloaded provider also fails with server errors and
+                # timeouts, but those do not end a run of throttling errors
+                self._decrease(now, latency)
+            elif succeeded:
+                self._consecutive_throttles = 0
+
+                if self.target_latency is not None and latency > self.target_latency:
+                    self._decrease(now, latency)
+                else:
+                    self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+
+            self._condition.notify_all()
+
+            for loop, waiter in self._async_waiters:
+                loop.call_soon_threadsafe(self._wake, waiter)
+
+            self._async_waiters = []
+
+    @staticmethod
+    def _wake(waiter: asyncio.Future):
+        # the waiting coroutine may have been cancelled in the meantime
+        if not waiter.done():
+            waiter.set_result(None)
+
+    def _pause(self, error: RateLimitError) -> float:
+        if error.retry_after:
+            return error.retry_after
+
+        backoff = min(
+            self.max_backoff, self.base_backoff * 2 ** (self._consecutive_throttles - 1)
+        )
+
+        return random.uniform(backoff / 2, backoff)
+
+    def _reserve(self, tokens: int) -> float:
+        wait = max(0.0, self.paused_until - time.monotonic())
+
+        if self.requests is not None:
+            wait = max(wait, self.requests.reserve(1))
+
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.reserve(tokens))
+
+        return wait
+
+    def _decrease(self, now: float, latency: float):
+        # requests already in flight when the limit was cut report the same
+        # congestion, so decrease at most once per round trip
+        if now - self._last_decrease < latency:
+            return
+
+        self._last_decrease = now
+        self.limit = max(self.min_concurrency, self.limit * self.decrease_factor)
+
+
+class RateLimitedConnection(BaseConnection):
+    """Wraps a connection so its requests go through an `AdaptiveRateLimiter`
+
+    A request rejected with a `RateLimitError` slows the limiter down and
+    the error is raised again. The agent's `RetryPolicy` owns the retries,
+    and its next attempt waits for the limiter's pause.
+
+    Parameters
+    ----------
+    connection: BaseConnection
+        The connection requests are sent through
+
+    limiter: AdaptiveRateLimiter
+        The limiter to use, a default limiter is created when omitted
+
+    output_tokens: int
+        Estimated response size counted against the tokens per minute limit
+    """
+    def __init__(
+        self,
+        connection: BaseConnection,
+        limiter: AdaptiveRateLimiter = None,
+        output_tokens: int = 500,
+    ):
+        if limiter is None:
+            limiter = AdaptiveRateLimiter()
+
+        self.connection = connection
+        self.limiter = limiter
+        self.output_tokens = output_tokens
+
+    def complete(
+        self, instructions: str, prompt: str, output_structure: BaseModel
+    ) -> Completion:
+        tokens = self._estimate_tokens(instructions, prompt, output_structure)
+
+        self.limiter.acquire(tokens)
+        start = time.monotonic()
+
+        try:
+            result = self.connection.complete(instructions, prompt, output_structure)
+        except RateLimitError as e:
+            self.limiter.release(time.monotonic() - start, e)
+            raise
+        except Exception:
+            self.limiter.release(time.monotonic() - start, failed=True)
+            raise
+        except BaseException:
+            self.limiter.release(time.monotonic() - start)
+            raise
+
+        self.limiter.release(time.monotonic() - start, succeeded=True)
+
+        return result
+
+    async def acomplete(
+        self, instructions: str, prompt: str, output_structure: BaseModel
+    ) -> Completion:
+        tokens = self._estimate_tokens(instructions, prompt, output_structure)
+
+        await self.limiter.aacquire(tokens)
+        start = time.monotonic()
+
+        try:
+            result = await self.connection.acomplete(instructions, prompt, output_structure)
+        except RateLimitError as e:
+            self.limiter.release(time.monotonic() - start, e)
+            raise
+        except Exception:
+            self.limiter.release(time.monotonic() - start, failed=True)
+            raise
+        except BaseException:
+            self.limiter.release(time.monotonic() - start)
+            raise
+
+        self.limiter.release(time.monotonic() - start, succeeded=True)
+
+        return result
+
+    def identity(self) -> Dict:
+        return self.connection.identity()
+
+    def warm_up(self, instructions: str = None):
+        self.connection.warm_up(instructions)
+
+    def _estimate_tokens(self, instructions: str, prompt: str, output_structure: BaseModel):
+        schema = json.dumps(output_structure.model_json_schema())
+
+        return estimate_tokens(instructions + prompt + schema) + self.output_tokens
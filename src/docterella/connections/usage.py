@@ -0,0 +1,164 @@
+from typing import Dict
+from typing import Iterable
+from typing import Optional
+
+class Usage:
+    """Tokens and timing of a request, or the sum over several requests
+
+    `input_tokens` counts the whole prompt, including the tokens written
+    to and read from the provider's prompt cache. Ollama only reports the
+    tokens it had to evaluate, so a prefix reused from its KV cache shows
+    as fewer input tokens rather than as cache reads.
+
+    Parameters
+    ----------
+    input_tokens: float
+        Tokens of the prompt
+
+    output_tokens: float
+        Tokens of the response
+
+    cache_creation_tokens: float
+        Prompt tokens written to the provider's prompt cache
+
+    cache_read_tokens: float
+        Prompt tokens read from the provider's prompt cache
+
+    latency: float
+        Seconds from sending the request to receiving the whole response,
+        None when it was not measured, such as for batched requests
+
+    time_to_first_token: float
+        Seconds before the first token was generated, None when the
+        provider does not report it
+
+    generation_time: float
+        Seconds spent generating the response, defaults to the latency.
+        Requests without either are left out of the tokens per second
+    """
+    def __init__(
+        self,
+        input_tokens: float = 0,
+        output_tokens: float = 0,
+        cache_creation_tokens: float = 0,
+        cache_read_tokens: float = 0,
+        latency: Optional[float] = 0.0,
+        time_to_first_token: float = None,
+        generation_time: float = None,
+    ):
+        if generation_time is None:
+            generation_time = latency
+
+        self.requests = 1
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.cache_creation_tokens = cache_creation_tokens
+        self.cache_read_tokens = cache_read_tokens
+        self.latency = latency or 0.0
+
+        # the output tokens of the requests whose generation was timed
+        self.generation_time = generation_time or 0.0
+        self.generated_tokens = 0 if generation_time is None else output_tokens
+
+        # summed over the requests that reported it
+        self.first_token_time = time_to_first_token or 0.0
+        self.first_token_requests = 0 if time_to_first_token is None else 1
+
+    @classmethod
+    def empty(cls) -> "Usage":
+        usage = cls()
+        usage.requests = 0
+
+        return usage
+
+    @classmethod
+    def total(cls, usages: Iterable[Optional["Usage"]]) -> Optional["Usage"]:
+        """Sum of the given usages, None when every one of them is None"""
+        usages = [u for u in usages if u is not None]
+
+        if not usages:
+            return None
+
+        total = cls.empty()
+
+        for usage in usages:
+            total.add(usage)
+
+        return total
+
+    def add(self, other: Optional["Usage"]):
+        if other is None:
+            return
+
+        self.requests += other.requests
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+        self.cache_creation_tokens += other.cache_creation_tokens
+        self.cache_read_tokens += other.cache_read_tokens
+        self.latency += other.latency
+        self.generation_time += other.generation_time
+        self.generated_tokens += other.generated_tokens
+        self.first_token_time += other.first_token_time
+        self.first_token_requests += other.first_token_requests
+
+    def split(self, parts: int) -> "Usage":
+        """One of `parts` equal shares, for a request that covered several nodes"""
+        share = Usage.empty()
+
+        for name, value in vars(self).items():
+            setattr(share, name, value / parts)
+
+        return share
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        """Mean seconds to the first token over the requests that reported it"""
+        if not self.first_token_requests:
+            return None
+
+        return self.first_token_time / self.first_token_requests
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        """Output tokens per second of generation, None when no timed request counted any"""
+        if not self.generation_time or not self.generated_tokens:
+            return None
+
+        return self.generated_tokens / self.generation_time
+
+    @property
+    def cache_read_ratio(self) -> Optional[float]:
+        """Share of the prompt tokens read from the provider's prompt cache"""
+        if not self.input_tokens:
+            return None
+
+        return self.cache_read_tokens / self.input_tokens
+
+    def to_dict(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cache_creation_tokens": self.cache_creation_tokens,
+            "cache_read_tokens": self.cache_read_tokens,
+            "cache_read_ratio": self.cache_read_ratio,
+            "latency": self.latency,
+            "time_to_first_token": self.time_to_first_token,
+            "tokens_per_second": self.tokens_per_second,
+        }
+
+
+class Completion:
+    """Response text of a request along with its usage
+
+    Parameters
+    ----------
+    text: str
+        The model's response
+
+    usage: Usage
+        Tokens and timing of the request
+    """
+    def __init__(self, text: str, usage: Usage):
+        self.text = text
+        self.usage = usage
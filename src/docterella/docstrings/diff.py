@@ -0,0 +1,97 @@
+from typing import Dict
+from typing import List
+
+from docterella.docstrings.parsing import parse_docstring
+from docterella.pydantic.components import Argument
+from docterella.pydantic.components import ClassDocstring
+from docterella.pydantic.components import FunctionDocstring
+from docterella.results import ValidationResults
+
+class DocstringDiff:
+    """Differences between an existing docstring and its corrected version
+
+    Parameters
+    ----------
+    original: FunctionDocstring | ClassDocstring
+        The docstring as currently written, None if the node has none
+
+    corrected: FunctionDocstring | ClassDocstring
+        The docstring proposed by the model
+    """
+    def __init__(self, original, corrected):
+        old_description, old_args, old_returns = self._components(original)
+        new_description, new_args, new_returns = self._components(corrected)
+
+        old_by_name = {a.name: a for a in old_args}
+        new_by_name = {a.name: a for a in new_args}
+
+        self.description_changed = not self._same_text(old_description, new_description)
+        self.added_arguments: List[Argument] = [
+            a for a in new_args if a.name not in old_by_name
+        ]
+        self.removed_arguments: List[Argument] = [
+            a for a in old_args if a.name not in new_by_name
+        ]
+        self.changed_arguments = [
+            (old_by_name[a.name], a) for a in new_args
+            if a.name in old_by_name and not self._same_component(old_by_name[a.name], a)
+        ]
+        self.return_values_changed = len(old_returns) != len(new_returns) or not all(
+            self._same_component(old, new) for old, new in zip(old_returns, new_returns)
+        )
+
+    @staticmethod
+    def from_result(result: ValidationResults):
+        """Compares a node's existing docstring with the result's correction"""
+        return DocstringDiff(parse_docstring(result.metadata), result.docstring)
+
+    @property
+    def is_empty(self) -> bool:
+        return not (
+            self.description_changed
+            or self.added_arguments
+            or self.removed_arguments
+            or self.changed_arguments
+            or self.return_values_changed
+        )
+
+    def to_dict(self) -> Dict:
+        return {
+            "description_changed": self.description_changed,
+            "added_arguments": [a.model_dump() for a in self.added_arguments],
+            "removed_arguments": [a.model_dump() for a in self.removed_arguments],
+            "changed_arguments": [
+                {"original": old.model_dump(), "corrected": new.model_dump()}
+                for old, new in self.changed_arguments
+            ],
+            "return_values_changed": self.return_values_changed,
+        }
+
+    @staticmethod
+    def _same_text(first: str, second: str) -> bool:
+        # whitespace and a closing period are formatting, not content
+        return " ".join(first.split()).rstrip(".") == " ".join(second.split()).rstrip(".")
+
+    @staticmethod
+    def _same_component(first, second) -> bool:
+        return (
+            DocstringDiff._same_text(first.data_type, second.data_type)
+            and DocstringDiff._same_text(first.description, second.description)
+        )
+
+    @staticmethod
+    def _components(docstring):
+        if docstring is None:
+            return "", [], []
+
+        if isinstance(docstring, FunctionDocstring):
+            return (
+                docstring.correct_function_description,
+                docstring.correct_function_arguments,
+                docstring.correct_function_return_values,
+            )
+
+        if isinstance(docstring, ClassDocstring):
+            return docstring.correct_class_description, docstring.correct_class_arguments, []
+
+        raise TypeError(f"Cannot compare docstring of type {type(docstring)}")
@@ -0,0 +1,146 @@
+import re
+
+from abc import ABC
+from abc import abstractmethod
+
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+from docterella.pydantic.components import Argument
+from docterella.pydantic.components import ClassDocstring
+from docterella.pydantic.components import FunctionDocstring
+from docterella.pydantic.components import ReturnValue
+from docterella.pydantic.metadata import MetaDataTypes
+
+_BRACKETED = re.compile(r"\[[^\[\]]*\]")
+
+class DocstringParser(ABC):
+    """Base class for parsing docstrings into the components the model returns
+
+    This is the inverse of `DocstringBuilder`. Subclasses split a docstring
+    into its description and named sections, then parse the entries of the
+    argument and return sections.
+
+    Parameters
+    ----------
+    argument_sections: List[str]
+        Lower case section titles that list the arguments
+
+    return_sections: List[str]
+        Lower case section titles that list the return values
+    """
+    def __init__(self, argument_sections: List[str], return_sections: List[str]):
+        self.argument_sections = argument_sections
+        self.return_sections = return_sections
+
+    def parse(self, docstring: str, node_type: MetaDataTypes):
+        if node_type == MetaDataTypes.FUNCTION_TYPE:
+            return self.parse_function(docstring)
+        elif node_type == MetaDataTypes.CLASS_TYPE:
+            return self.parse_class(docstring)
+        else:
+            raise ValueError(f"The node type {node_type} is unknown")
+
+    def parse_function(self, docstring: str) -> FunctionDocstring:
+        description, sections = self._split_sections(self._clean(docstring))
+
+        return FunctionDocstring(
+            correct_function_description=description,
+            correct_function_arguments=self._parse_arguments(
+                self._section(sections, self.argument_sections)
+            ),
+            correct_function_return_values=self._parse_return_values(
+                self._section(sections, self.return_sections)
+            ),
+        )
+
+    def parse_class(self, docstring: str) -> ClassDocstring:
+        description, sections = self._split_sections(self._clean(docstring))
+
+        return ClassDocstring(
+            correct_class_description=description,
+            correct_class_arguments=self._parse_arguments(
+                self._section(sections, self.argument_sections + ["attributes"])
+            ),
+        )
+
+    @abstractmethod
+    def _split_sections(self, docstring: str) -> Tuple[str, Dict[str, List[str]]]:
+        pass
+
+    @abstractmethod
+    def _parse_arguments(self, lines: List[str]) -> List[Argument]:
+        pass
+
+    @abstractmethod
+    def _parse_return_values(self, lines: List[str]) -> List[ReturnValue]:
+        pass
+
+    def _section(self, sections: Dict[str, List[str]], titles: List[str]) -> List[str]:
+        for title in titles:
+            if title in sections:
+                return sections[title]
+
+        return []
+
+    @staticmethod
+    def _clean(docstring: str) -> str:
+        docstring = docstring.expandtabs(4).strip()
+
+        # docstrings produced by the builders include the surrounding quotes
+        if docstring.startswith('"""') and docstring.endswith('"""'):
+            docstring = docstring[3:-3]
+
+        lines = docstring.strip("\n").splitlines()
+
+        if not lines:
+            return ""
+
+        indents = [
+            len(line) - len(line.lstrip()) for line in lines[1:] if line.strip()
+        ]
+        indent = min(indents, default=0)
+
+        return "\n".join([lines[0].strip()] + [line[indent:].rstrip() for line in lines[1:]])
+
+    @staticmethod
+    def _entries(lines: List[str]) -> List[Tuple[str, List[str]]]:
+        """Groups section lines into entry headers and their indented bodies"""
+        entries = []
+        indent = None
+
+        for line in lines:
+            if not line.strip():
+                continue
+
+            line_indent = len(line) - len(line.lstrip())
+
+            if indent is None or line_indent <= indent:
+                indent = line_indent
+                entries.append((line.strip(), []))
+            else:
+                entries[-1][1].append(line.strip())
+
+        return entries
+
+    @staticmethod
+    def _join(lines: List[str]) -> str:
+        return " ".join(line.strip() for line in lines if line.strip())
+
+    @staticmethod
+    def _looks_like_type(text: str) -> bool:
+        text = text.strip()
+
+        if not text or text.endswith("."):
+            return False
+
+        text = re.sub(r",\s*optional$", "", text)
+
+        while _BRACKETED.search(text):
+            text = _BRACKETED.sub("", text)
+
+        text = re.sub(r"\s*\|\s*", "|", text)
+        text = re.sub(r"\s+or\s+", "|", text)
+
+        return re.fullmatch(r"[\w\.\|'\"]+", text) is not None
@@ -1,4 +1,12 @@
+import re
+
 from docterella.docstrings.docstring_builder import DocstringBuilder
+from docterella.docstrings.docstring_parser import DocstringParser
+from docterella.pydantic.components import Argument
+from docterella.pydantic.components import ReturnValue
+
+_SECTION_HEADER = re.compile(r"^([A-Z][A-Za-z ]*):\s*$")
+_ARGUMENT_HEADER = re.compile(r"^(\*{0,2}\w+)\s*\(([^)]*)\)\s*:\s*(.*)$")
 
 class GoogleStyleBuilder(DocstringBuilder):
     def __init__(self):
@@ -20,4 +28,74 @@ class GoogleStyleBuilder(DocstringBuilder):
         
         output += "\"\"\""
 
-        return output
\ No newline at end of file
+        return output
+
+class GoogleStyleParser(DocstringParser):
+    def __init__(self):
+        super().__init__(
+            argument_sections=["args", "arguments", "parameters", "params"],
+            return_sections=["returns", "return", "yields", "yield"],
+        )
+
+    def _split_sections(self, docstring):
+        description = []
+        sections = {}
+        current = None
+
+        for line in docstring.splitlines():
+            match = _SECTION_HEADER.match(line)
+
+            if match:
+                current = sections.setdefault(match.group(1).lower(), [])
+            elif current is None:
+                description.append(line)
+            else:
+                current.append(line)
+
+        return self._join(description), sections
+
+    def _parse_arguments(self, lines):
+        arguments = []
+
+        for header, body in self._entries(lines):
+            match = _ARGUMENT_HEADER.match(header)
+
+            if match:
+                name, data_type, description = match.groups()
+                description = self._join([description] + body)
+            else:
+                name, _, rest = header.partition(":")
+                data_type, description = self._type_and_description(rest, body)
+
+            arguments.append(Argument(
+                name=name.strip(), data_type=data_type.strip(), description=description
+            ))
+
+        return arguments
+
+    def _parse_return_values(self, lines):
+        return_values = []
+
+        for header, body in self._entries(lines):
+            data_type, separator, rest = header.partition(":")
+
+            if separator and self._looks_like_type(data_type):
+                description = self._join([rest] + body)
+            elif self._looks_like_type(header):
+                data_type, description = header, self._join(body)
+            else:
+                data_type, description = "", self._join([header] + body)
+
+            return_values.append(ReturnValue(
+                data_type=data_type.strip(), description=description
+            ))
+
+        return return_values
+
+    def _type_and_description(self, rest: str, body):
+        # `name: type` followed by an indented description is treated as a
+        # type, otherwise the text after the colon is the description
+        if body and self._looks_like_type(rest):
+            return rest, self._join(body)
+
+        return "", self._join([rest] + body)
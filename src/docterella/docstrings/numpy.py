@@ -1,4 +1,11 @@
+import re
+
 from docterella.docstrings.docstring_builder import DocstringBuilder
+from docterella.docstrings.docstring_parser import DocstringParser
+from docterella.pydantic.components import Argument
+from docterella.pydantic.components import ReturnValue
+
+_UNDERLINE = re.compile(r"^\s*-{3,}\s*$")
 
 class NumpyStyleBuilder(DocstringBuilder):
     def __init__(self):
@@ -24,4 +31,64 @@ class NumpyStyleBuilder(DocstringBuilder):
 
         return output
 
-    
\ No newline at end of file
+    
+
+class NumpyStyleParser(DocstringParser):
+    def __init__(self):
+        super().__init__(
+            argument_sections=["parameters", "params", "arguments", "args"],
+            return_sections=["returns", "return", "yields", "yield"],
+        )
+
+    def _split_sections(self, docstring):
+        description = []
+        sections = {}
+        current = None
+
+        lines = docstring.splitlines()
+        skip = False
+
+        for line, following in zip(lines, lines[1:] + [""]):
+            if skip:
+                skip = False
+                continue
+
+            if line.strip() and _UNDERLINE.match(following):
+                current = sections.setdefault(line.strip().lower(), [])
+                skip = True
+            elif current is None:
+                description.append(line)
+            else:
+                current.append(line)
+
+        return self._join(description), sections
+
+    def _parse_arguments(self, lines):
+        arguments = []
+
+        for header, body in self._entries(lines):
+            name, _, data_type = header.partition(":")
+
+            arguments.append(Argument(
+                name=name.strip(),
+                data_type=data_type.strip(),
+                description=self._join(body),
+            ))
+
+        return arguments
+
+    def _parse_return_values(self, lines):
+        return_values = []
+
+        for header, body in self._entries(lines):
+            name, separator, data_type = header.partition(":")
+
+            # entries are either `type` or `name : type`
+            if not separator or not data_type.strip():
+                data_type = name
+
+            return_values.append(ReturnValue(
+                data_type=data_type.strip(), description=self._join(body)
+            ))
+
+        return return_values
@@ -0,0 +1,53 @@
+import ast
+import re
+
+from typing import Optional
+
+from docterella.docstrings.docstring_parser import DocstringParser
+from docterella.docstrings.google import GoogleStyleParser
+from docterella.docstrings.numpy import NumpyStyleParser
+from docterella.pydantic.metadata import Metadata
+from docterella.pydantic.metadata import MetaDataTypes
+
+_NUMPY_SECTION = re.compile(r"^\s*\w[\w ]*\n\s*-{3,}\s*$", re.MULTILINE)
+
+def parser_for(docstring: str) -> DocstringParser:
+    """Picks the parser matching the style of an existing docstring
+
+    NumPy docstrings are recognised by their underlined section titles, any
+    other docstring is parsed as Google style.
+    """
+    if _NUMPY_SECTION.search(docstring):
+        return NumpyStyleParser()
+
+    return GoogleStyleParser()
+
+
+def existing_docstring(metadata: Metadata) -> Optional[str]:
+    """Extracts the docstring currently written in a parsed node's source"""
+    try:
+        node = ast.parse(metadata.source_code).body[0]
+    except (SyntaxError, IndexError):
+        return None
+
+    if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return None
+
+    return ast.get_docstring(node)
+
+
+def parse_docstring(metadata: Metadata):
+    """Parses a node's existing docstring into the model output components
+
+    Returns a `FunctionDocstring` or `ClassDocstring` depending on the node,
+    or None when the node has no docstring.
+    """
+    if metadata.type == MetaDataTypes.CLASS_TYPE:
+        docstring = metadata.docstring
+    else:
+        docstring = existing_docstring(metadata)
+
+    if not docstring:
+        return None
+
+    return parser_for(docstring).parse(docstring, metadata.type)
@@ -0,0 +1,85 @@
+import json
+import os
+import threading
+
+from typing import Dict
+from typing import Optional
+
+from docterella.results import ValidationResults
+
+class Journal:
+    """Append-only JSON lines record of the results completed during a run
+
+    Each completed `ValidationResults` is written and flushed as its own
+    line, keyed by the node id, so a run that dies part way through can be
+    resumed without paying for the finished nodes again.
+
+    Parameters
+    ----------
+    path: str
+        Location of the journal file
+
+    resume: bool
+        Load the entries already in the journal and keep appending to it.
+        Otherwise any existing journal is replaced
+
+    fsync: bool
+        Force every entry to disk rather than only flushing it to the OS
+    """
+    def __init__(self, path: str, resume: bool = False, fsync: bool = False):
+        self.path = path
+        self.fsync = fsync
+        self.entries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+        if resume and os.path.exists(path):
+            self.entries = self._load()
+
+        self._file = open(path, "a" if resume else "w")
+
+        # start on a fresh line if the previous run died mid-write
+        if self._file.tell() > 0 and not self._ends_with_newline():
+            self._file.write("\n")
+
+    def get(self, node_id: str) -> Optional[Dict]:
+        """Returns the result of a node journaled by a previous run, as written by `to_dict`
+
+        Results recorded during this run are only written to the file, so
+        a long run does not keep its whole report in memory.
+        """
+        return self.entries.get(node_id)
+
+    def record(self, result: ValidationResults):
+        entry = {"node_id": result.metadata.node_id, **result.to_dict()}
+        line = json.dumps(entry)
+
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+            if self.fsync:
+                os.fsync(self._file.fileno())
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _load(self) -> Dict[str, Dict]:
+        entries = {}
+
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # the last line is incomplete if the run died mid-write
+                    continue
+
+                entries[entry["node_id"]] = entry
+
+        return entries
@@ -0,0 +1,56 @@
+from docterella.pydantic.metadata import MetaDataTypes
+from docterella.tokens import estimate_tokens
+
+class NodePacker:
+    """Groups consecutive small functions so they share a single request
+
+    Packing amortises the instructions, which are sent once per request,
+    over several functions. Classes and functions larger than
+    `max_node_tokens` are always sent on their own.
+
+    Parameters
+    ----------
+    token_budget: int
+        Maximum estimated tokens of source code in one packed request
+
+    max_nodes: int
+        Maximum number of functions in one packed request
+
+    max_node_tokens: int
+        Functions estimated to be larger than this are not packed
+    """
+    def __init__(self, token_budget: int = 2000, max_nodes: int = 8, max_node_tokens: int = 400):
+        self.token_budget = token_budget
+        self.max_nodes = max_nodes
+        self.max_node_tokens = max_node_tokens
+
+    def pack(self, nodes):
+        """Generates lists of nodes that should be validated together"""
+        batch = []
+        batch_tokens = 0
+
+        for node in nodes:
+            tokens = None
+
+            if node.type == MetaDataTypes.FUNCTION_TYPE:
+                tokens = estimate_tokens(node.source_code)
+
+            if tokens is None or tokens > self.max_node_tokens:
+                if batch:
+                    yield batch
+                    batch, batch_tokens = [], 0
+
+                yield [node]
+                continue
+
+            if batch and (
+                batch_tokens + tokens > self.token_budget or len(batch) >= self.max_nodes
+            ):
+                yield batch
+                batch, batch_tokens = [], 0
+
+            batch.append(node)
+            batch_tokens += tokens
+
+        if batch:
+            yield batch
@@ -1,29 +1,46 @@
 import ast
 
 from docterella.parsers.sequence_parser import SequenceParser
+from docterella.parsers.node_records import ClassRecord
+from docterella.parsers.node_records import FunctionRecord
+from docterella.parsers.source_buffer import SourceBuffer
 from docterella.pydantic.metadata import ClassMetadata
 from docterella.pydantic.metadata import FunctionMetadata
 
 from typing import List
 
 class FileParser(SequenceParser):
-    def __init__(self, filepath: str, excluded_names: List[str] = None):
+    def __init__(
+        self, filepath: str, excluded_names: List[str] = None, compact: bool = False
+    ):
         self.filepath = filepath
+        # compact parsing yields slotted records that share the file buffer
+        # instead of pydantic metadata holding copies of the source
+        self.compact = compact
         
         if excluded_names is None:
-            self.excluded_names = ["__init__"]
+            excluded_names = ["__init__"]
+
+        self.excluded_names = excluded_names
 
     def parse(self):
         file = self.__read_file()
 
         parsed_content = ast.parse(file)
+        source = SourceBuffer(file)
 
         for node in ast.walk(parsed_content):
             if isinstance(node, ast.FunctionDef) and node.name not in self.excluded_names:
-                yield FunctionMetadata.from_ast(node, self.filepath)
+                if self.compact:
+                    yield FunctionRecord(node, self.filepath, source)
+                else:
+                    yield FunctionMetadata.from_ast(node, self.filepath, source)
 
             if isinstance(node, ast.ClassDef) and node.name not in self.excluded_names:
-                yield ClassMetadata.from_ast(node, self.filepath)
+                if self.compact:
+                    yield ClassRecord(node, self.filepath, source)
+                else:
+                    yield ClassMetadata.from_ast(node, self.filepath, source)
 
     def __read_file(self):
         with open(self.filepath) as f:
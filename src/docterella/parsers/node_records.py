@@ -0,0 +1,119 @@
+import ast
+
+from abc import ABC
+from abc import abstractmethod
+from typing import Dict
+from typing import Optional
+
+from docterella.parsers.source_buffer import SourceBuffer
+from docterella.pydantic.metadata import ClassMetadata
+from docterella.pydantic.metadata import FunctionMetadata
+from docterella.pydantic.metadata import MetaDataTypes
+from docterella.pydantic.metadata import make_node_id
+
+class NodeRecord(ABC):
+    """Lightweight stand-in for `Metadata` used while a run is in progress
+
+    A record stores offsets into the `SourceBuffer` shared by every node of
+    a file rather than a copy of the node's source, which is only sliced out
+    when `source_code` is read. Records expose the same attributes the agent
+    uses and are converted to the pydantic metadata models by `to_metadata`
+    when a result is reported.
+    """
+    __slots__ = (
+        "source_path",
+        "name",
+        "lineno",
+        "end_lineno",
+        "col_offset",
+        "end_col_offset",
+        "buffer",
+        "start",
+        "end",
+    )
+
+    type = None
+
+    def __init__(self, node: ast.AST, source_path: Optional[str], buffer: SourceBuffer):
+        self.source_path = source_path
+        self.name = node.name
+        self.lineno = node.lineno
+        self.end_lineno = node.end_lineno
+        self.col_offset = node.col_offset
+        self.end_col_offset = node.end_col_offset
+        self.buffer = buffer
+        self.start, self.end = buffer.span(node)
+
+    @property
+    def source_code(self) -> str:
+        return self.buffer.segment(self.start, self.end)
+
+    @property
+    def node_id(self) -> str:
+        return make_node_id(self.source_path, self.name, self.lineno)
+
+    def _metadata_kv(self) -> Dict:
+        return {
+            "source_path": self.source_path,
+            "name": self.name,
+            "lineno": self.lineno,
+            "end_lineno": self.end_lineno,
+            "col_offset": self.col_offset,
+            "end_col_offset": self.end_col_offset,
+            "source_code": self.source_code,
+        }
+
+    @abstractmethod
+    def to_metadata(self):
+        """Converts the record to its pydantic metadata model"""
+        pass
+
+    def to_dict(self) -> Dict:
+        return self.to_metadata().to_dict()
+
+
+class FunctionRecord(NodeRecord):
+    __slots__ = ()
+
+    type = MetaDataTypes.FUNCTION_TYPE
+
+    def __init__(self, node: ast.FunctionDef, source_path: Optional[str], buffer: SourceBuffer):
+        if not isinstance(node, ast.FunctionDef):
+            raise TypeError("Argument `node` must be type ast.FunctionDef")
+
+        super().__init__(node, source_path, buffer)
+
+    def to_metadata(self) -> FunctionMetadata:
+        return FunctionMetadata(**self._metadata_kv())
+
+
+class ClassRecord(NodeRecord):
+    __slots__ = ("docstring", "constructor")
+
+    type = MetaDataTypes.CLASS_TYPE
+
+    def __init__(self, node: ast.ClassDef, source_path: Optional[str], buffer: SourceBuffer):
+        if not isinstance(node, ast.ClassDef):
+            raise TypeError("Argument `node` must be type ast.ClassDef")
+
+        super().__init__(node, source_path, buffer)
+
+        self.docstring = ast.get_docstring(node)
+        self.constructor = None
+
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, ast.FunctionDef) and child.name == "__init__":
+                self.constructor = FunctionRecord(child, source_path, buffer)
+                break
+
+    def to_metadata(self) -> ClassMetadata:
+        constructor = None
+
+        if self.constructor is not None:
+            constructor = self.constructor.to_metadata()
+
+        return ClassMetadata(
+            **self._metadata_kv(),
+            constructor=constructor,
+            docstring=self.docstring,
+        )
@@ -0,0 +1,122 @@
+import os
+import re
+
+from typing import List
+
+class PathPattern:
+    """Glob pattern following the matching rules used by .gitignore files
+
+    Patterns without a slash match the file or directory name at any depth.
+    Patterns containing a slash are matched against the full path relative
+    to `base`. `*` does not cross directory boundaries while `**` does. A
+    leading `!` negates the pattern and a trailing `/` restricts it to
+    directories.
+    """
+    def __init__(self, pattern: str, base: str = ""):
+        self.base = base
+        self.negated = pattern.startswith("!")
+
+        if self.negated:
+            pattern = pattern[1:]
+
+        self.directory_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+
+        anchored = "/" in pattern
+        pattern = pattern.lstrip("/")
+
+        regex = PathPattern._translate(pattern)
+
+        if not anchored:
+            regex = f"(?:.*/)?{regex}"
+
+        self.regex = re.compile(f"{regex}$")
+
+    def matches(self, path: str, is_dir: bool = False) -> bool:
+        """Checks a path, relative to the project root and using `/` separators"""
+        if self.directory_only and not is_dir:
+            return False
+
+        if self.base:
+            if not path.startswith(f"{self.base}/"):
+                return False
+
+            path = path[len(self.base) + 1:]
+
+        return self.regex.match(path) is not None
+
+    @staticmethod
+    def _translate(pattern: str) -> str:
+        regex = ""
+        i = 0
+
+        while i < len(pattern):
+            char = pattern[i]
+
+            if pattern.startswith("**/", i):
+                regex += "(?:.*/)?"
+                i += 3
+            elif pattern.startswith("**", i):
+                regex += ".*"
+                i += 2
+            elif char == "*":
+                regex += "[^/]*"
+                i += 1
+            elif char == "?":
+                regex += "[^/]"
+                i += 1
+            elif char == "[" and "]" in pattern[i + 1:]:
+                end = pattern.index("]", i + 1)
+                group = pattern[i + 1:end].replace("\\", "\\\\")
+
+                if group.startswith("!"):
+                    group = "^" + group[1:]
+
+                regex += f"[{group}]"
+                i = end + 1
+            elif char == "\\" and i + 1 < len(pattern):
+                regex += re.escape(pattern[i + 1])
+                i += 2
+            else:
+                regex += re.escape(char)
+                i += 1
+
+        return regex
+
+
+class GitIgnore:
+    """Collection of ignore rules loaded from the .gitignore files of a tree
+
+    Rules are evaluated in the order they were added and the last matching
+    rule wins, so rules from nested .gitignore files override their parents.
+    """
+    def __init__(self, patterns: List[PathPattern] = None):
+        if patterns is None:
+            patterns = []
+
+        self.patterns = patterns
+
+    def load(self, directory: str, base: str = ""):
+        """Adds the rules of `directory/.gitignore`, if the file exists"""
+        path = os.path.join(directory, ".gitignore")
+
+        if not os.path.isfile(path):
+            return
+
+        with open(path) as f:
+            for line in f:
+                line = line.rstrip("\n").rstrip()
+
+                if not line or line.startswith("#"):
+                    continue
+
+                self.patterns.append(PathPattern(line, base))
+
+    def is_ignored(self, path: str, is_dir: bool = False) -> bool:
+        ignored = False
+
+        for pattern in self.patterns:
+            if pattern.matches(path, is_dir):
+                ignored = not pattern.negated
+
+        return ignored
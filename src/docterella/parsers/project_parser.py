@@ -0,0 +1,161 @@
+import logging
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import as_completed
+
+from docterella.parsers.file_parser import FileParser
+from docterella.parsers.path_filter import GitIgnore
+from docterella.parsers.path_filter import PathPattern
+from docterella.parsers.sequence_parser import SequenceParser
+
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+def _parse_file(filepath: str, excluded_names: List[str] = None, compact: bool = False):
+    """Parses a file, returning its nodes and the error that stopped it, if any"""
+    # module level so it can be pickled and sent to the worker processes. The
+    # error goes back as text since not every exception, such as pydantic's
+    # ValidationError, survives pickling
+    try:
+        return list(FileParser(filepath, excluded_names, compact).parse()), None
+    except Exception as e:
+        return [], f"{type(e).__name__}: {e}"
+
+
+class ProjectParser(SequenceParser):
+    """Parses every python file in a directory tree
+
+    Files are parsed in a pool of worker processes and the nodes of each file
+    are yielded as soon as that file has been parsed. A file that cannot be
+    parsed, such as one with invalid syntax or encoding, is logged and
+    skipped.
+
+    Parameters
+    ----------
+    root: str
+        Directory to search for source files
+
+    include: List[str]
+        Glob patterns a file must match to be parsed. Defaults to `*.py`
+
+    exclude: List[str]
+        Glob patterns for files and directories to skip. Patterns follow the
+        same rules as .gitignore entries
+
+    excluded_names: List[str]
+        Function and class names that should not be validated
+
+    use_gitignore: bool
+        Skip files ignored by the .gitignore files found in the tree
+
+    max_workers: int
+        Number of worker processes. With a single worker the files are parsed
+        in the current process
+
+    ordered: bool
+        Yield the nodes in the order the files were found rather than the
+        order they finish parsing
+
+    compact: bool
+        Yield slotted node records instead of pydantic metadata, see
+        `FileParser`
+    """
+    def __init__(
+        self,
+        root: str,
+        include: List[str] = None,
+        exclude: List[str] = None,
+        excluded_names: List[str] = None,
+        use_gitignore: bool = True,
+        max_workers: int = None,
+        ordered: bool = False,
+        compact: bool = False,
+    ):
+        if include is None:
+            include = ["*.py"]
+
+        if exclude is None:
+            exclude = []
+
+        self.root = root
+        self.include = [PathPattern(p) for p in include]
+        self.exclude = [PathPattern(p) for p in exclude]
+        self.excluded_names = excluded_names
+        self.use_gitignore = use_gitignore
+        self.max_workers = max_workers
+        self.ordered = ordered
+        self.compact = compact
+
+    def parse(self):
+        filepaths = list(self.files())
+
+        if self.max_workers == 1:
+            for filepath in filepaths:
+                yield from self._file_nodes(
+                    filepath, _parse_file(filepath, self.excluded_names, self.compact)
+                )
+
+            return
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(_parse_file, filepath, self.excluded_names, self.compact): filepath
+                for filepath in filepaths
+            }
+
+            for future in futures if self.ordered else as_completed(futures):
+                yield from self._file_nodes(futures[future], future.result())
+
+    @staticmethod
+    def _file_nodes(filepath: str, parsed):
+        nodes, error = parsed
+
+        if error is not None:
+            logger.warning("Skipping %s, it could not be parsed: %s", filepath, error)
+
+        return nodes
+
+    def files(self):
+        """Generates the paths of the source files that should be parsed"""
+        gitignore = GitIgnore()
+
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            relative_dir = os.path.relpath(dirpath, self.root).replace(os.sep, "/")
+
+            if relative_dir == ".":
+                relative_dir = ""
+
+            if self.use_gitignore:
+                gitignore.load(dirpath, relative_dir)
+
+            dirnames[:] = sorted(
+                d for d in dirnames
+                if d != ".git"
+                and not self._is_excluded(gitignore, self._join(relative_dir, d), True)
+            )
+
+            for filename in sorted(filenames):
+                relative_path = self._join(relative_dir, filename)
+
+                if not any(p.matches(relative_path) for p in self.include):
+                    continue
+
+                if self._is_excluded(gitignore, relative_path, False):
+                    continue
+
+                yield os.path.join(dirpath, filename)
+
+    def _is_excluded(self, gitignore: GitIgnore, path: str, is_dir: bool):
+        if any(p.matches(path, is_dir) for p in self.exclude):
+            return True
+
+        return gitignore.is_ignored(path, is_dir)
+
+    @staticmethod
+    def _join(directory: str, name: str):
+        if not directory:
+            return name
+
+        return f"{directory}/{name}"
@@ -0,0 +1,76 @@
+import ast
+import re
+import textwrap
+
+from bisect import bisect_right
+
+_LINE_ENDING = re.compile(r"\r\n|\r|\n")
+
+class SourceBuffer:
+    """Source text of a file along with the offsets needed to slice out nodes
+
+    The start of every line is computed once, so slicing a node costs time
+    proportional to the node rather than to the whole file.
+
+    Parameters
+    ----------
+    text: str
+        The full contents of the source file
+    """
+    def __init__(self, text: str):
+        self.text = text
+        self._line_starts = [0] + [m.end() for m in _LINE_ENDING.finditer(text)]
+
+    def offset(self, lineno: int, col_offset: int) -> int:
+        """Converts an ast position (1-based line, UTF-8 byte column) to an index"""
+        start = self._line_starts[lineno - 1]
+
+        if col_offset == 0:
+            return start
+
+        line = self.text[start:start + col_offset]
+
+        # ast columns count bytes, which only equal characters for ascii text
+        if line.isascii():
+            return start + col_offset
+
+        end = self._line_end(lineno)
+        encoded = self.text[start:end].encode("utf-8")[:col_offset]
+
+        return start + len(encoded.decode("utf-8", errors="ignore"))
+
+    def lineno(self, offset: int) -> int:
+        """Returns the 1-based line containing the character at `offset`"""
+        return bisect_right(self._line_starts, offset)
+
+    def span(self, node: ast.AST):
+        """Returns the start and end index of a node, including its decorators"""
+        lineno = node.lineno
+
+        for decorator in getattr(node, "decorator_list", []):
+            lineno = min(lineno, decorator.lineno)
+
+        start = self.offset(lineno, node.col_offset)
+        end = self.offset(node.end_lineno, node.end_col_offset)
+
+        return start, end
+
+    def segment(self, start: int, end: int) -> str:
+        """Slices the text between two indices and removes its indentation"""
+        line_start = self._line_starts[self.lineno(start) - 1]
+        prefix = self.text[line_start:start]
+
+        if prefix.strip():
+            prefix = " " * len(prefix)
+
+        return textwrap.dedent(prefix + self.text[start:end])
+
+    def source(self, node: ast.AST) -> str:
+        """Returns the source of a node exactly as written in the file"""
+        return self.segment(*self.span(node))
+
+    def _line_end(self, lineno: int) -> int:
+        if lineno < len(self._line_starts):
+            return self._line_starts[lineno]
+
+        return len(self.text)
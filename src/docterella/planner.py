@@ -0,0 +1,247 @@
+import json
+
+from itertools import groupby
+from typing import Dict
+from typing import List
+
+from docterella.agents.base import ValidationAgent
+from docterella.packer import NodePacker
+from docterella.parsers.sequence_parser import SequenceParser
+from docterella.tokens import estimate_tokens
+
+# typical size of one node's assessment, the reasoning style also explains itself
+OUTPUT_TOKENS = {
+    "basic": 350,
+    "reasoning": 700,
+    "streamlined": 250,
+}
+
+# USD per million input and output tokens, matched by model name prefix
+PRICING = {
+    "claude-3-5-haiku": (0.80, 4.00),
+    "claude-3-7-sonnet": (3.00, 15.00),
+    "claude-sonnet-4": (3.00, 15.00),
+    "claude-opus-4": (15.00, 75.00),
+    "gpt-5-nano": (0.05, 0.40),
+    "gpt-5-mini": (0.25, 2.00),
+    "gpt-5": (1.25, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+}
+
+def lookup_pricing(model: str):
+    """Returns the input and output price per million tokens, free if unknown"""
+    for prefix in sorted(PRICING, key=len, reverse=True):
+        if model.startswith(prefix):
+            return PRICING[prefix]
+
+    # models served locally, such as through Ollama, have no per token price
+    return (0.0, 0.0)
+
+
+class PlanTotals:
+    """Projected requests, tokens, cost and time of part of a run"""
+    def __init__(self):
+        self.nodes = 0
+        self.requests = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cost = 0.0
+        self.seconds = 0.0
+
+    def add(self, other: "PlanTotals"):
+        self.nodes += other.nodes
+        self.requests += other.requests
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+        self.cost += other.cost
+        self.seconds += other.seconds
+
+    def to_dict(self) -> Dict:
+        return {
+            "nodes": self.nodes,
+            "requests": self.requests,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cost": self.cost,
+            "seconds": self.seconds,
+        }
+
+
+class RunPlan:
+    """Projection of a run, broken down per style and per file
+
+    Each style is an alternative run over the same nodes, so files and
+    totals are projected for every style separately rather than summed.
+    `seconds` add up the time of every request, the wall time of the run
+    divides them by the concurrency.
+    """
+    def __init__(self, concurrency: int):
+        self.concurrency = concurrency
+        self.files: Dict[str, Dict[str, PlanTotals]] = {}
+        self.styles: Dict[str, PlanTotals] = {}
+
+    def add(self, source_path: str, style: str, totals: PlanTotals):
+        files = self.files.setdefault(style, {})
+        files.setdefault(source_path, PlanTotals()).add(totals)
+        self.styles.setdefault(style, PlanTotals()).add(totals)
+
+    def wall_time(self, totals: PlanTotals) -> float:
+        return totals.seconds / self.concurrency
+
+    def to_dict(self) -> Dict:
+        def row(totals):
+            return {**totals.to_dict(), "wall_time": self.wall_time(totals)}
+
+        return {
+            "concurrency": self.concurrency,
+            "styles": {
+                style: {
+                    "files": {k: row(v) for k, v in self.files[style].items()},
+                    "total": row(total),
+                }
+                for style, total in self.styles.items()
+            },
+        }
+
+    def to_text(self) -> str:
+        header = (
+            f"{'':<48} {'nodes':>7} {'requests':>8} {'input tok':>10} "
+            f"{'output tok':>10} {'cost $':>9} {'time':>9}"
+        )
+        sections = []
+
+        for style, total in self.styles.items():
+            lines = [f"style {style}", header]
+            lines += [self._format_row(name, totals) for name, totals in self.files[style].items()]
+            lines.append(self._format_row("total", total))
+            sections.append("\n".join(lines))
+
+        return "\n\n".join(sections)
+
+    def _format_row(self, name: str, totals: PlanTotals) -> str:
+        if len(name) > 48:
+            name = "..." + name[-45:]
+
+        return (
+            f"{name:<48} {totals.nodes:>7} {totals.requests:>8} "
+            f"{totals.input_tokens:>10} {totals.output_tokens:>10} "
+            f"{totals.cost:>9.4f} {self._format_time(self.wall_time(totals)):>9}"
+        )
+
+    @staticmethod
+    def _format_time(seconds: float) -> str:
+        minutes, seconds = divmod(round(seconds), 60)
+        hours, minutes = divmod(minutes, 60)
+
+        return f"{hours}:{minutes:02}:{seconds:02}"
+
+
+class DryRunPlanner:
+    """Estimates the tokens, cost and time of a run without calling a model
+
+    Every node is parsed and its prompt rendered exactly as the agent would
+    send it, including the output schema, then counted with the local
+    `estimate_tokens`. Nodes the agent's prevalidator or cache would answer
+    cost nothing. Output tokens are estimated per style, and time from the
+    rates at which the model reads and writes tokens.
+
+    Parameters
+    ----------
+    parser: SequenceParser
+        Parser producing the nodes the run would validate
+
+    agents: Dict[str, ValidationAgent]
+        The agent of every style to plan for, keyed by the style name. The
+        agents' connections are never used
+
+    pricing: Dict[str, tuple]
+        Input and output price per million tokens of each style, see
+        `lookup_pricing`. Styles without a price are free
+
+    concurrency: int
+        Number of requests the run would have in flight at once
+
+    packer: NodePacker
+        Optional packer the run would group small functions with. Functions
+        are only packed with others from the same file
+
+    output_tokens: Dict[str, int]
+        Estimated output tokens per node of each style, defaults to
+        `OUTPUT_TOKENS`
+
+    input_tokens_per_second: float
+        Rate at which the model evaluates prompts
+
+    output_tokens_per_second: float
+        Rate at which the model generates its response
+    """
+    def __init__(
+        self,
+        parser: SequenceParser,
+        agents: Dict[str, ValidationAgent],
+        pricing: Dict[str, tuple] = None,
+        concurrency: int = 1,
+        packer: NodePacker = None,
+        output_tokens: Dict[str, int] = None,
+        input_tokens_per_second: float = 2000.0,
+        output_tokens_per_second: float = 60.0,
+    ):
+        if pricing is None:
+            pricing = {}
+
+        if output_tokens is None:
+            output_tokens = OUTPUT_TOKENS
+
+        self.parser = parser
+        self.agents = agents
+        self.pricing = pricing
+        self.concurrency = concurrency
+        self.packer = packer
+        self.output_tokens = output_tokens
+        self.input_tokens_per_second = input_tokens_per_second
+        self.output_tokens_per_second = output_tokens_per_second
+
+    def plan(self) -> RunPlan:
+        plan = RunPlan(self.concurrency)
+
+        for batch in self._batches(list(self.parser.parse())):
+            for style, agent in self.agents.items():
+                plan.add(batch[0].source_path, style, self._estimate(style, agent, batch))
+
+        return plan
+
+    def _batches(self, nodes: List):
+        for _, file_nodes in groupby(nodes, key=lambda n: n.source_path):
+            file_nodes = list(file_nodes)
+
+            if self.packer is None:
+                yield from ([node] for node in file_nodes)
+            else:
+                yield from self.packer.pack(file_nodes)
+
+    def _estimate(self, style: str, agent: ValidationAgent, batch: List) -> PlanTotals:
+        totals = PlanTotals()
+        requests, pending = agent.render_requests(batch)
+
+        input_price, output_price = self.pricing.get(style, (0.0, 0.0))
+
+        totals.nodes = len(batch)
+        totals.requests = len(requests)
+        totals.input_tokens = sum(self._request_tokens(r) for r in requests)
+        totals.output_tokens = pending * self.output_tokens.get(style, OUTPUT_TOKENS["basic"])
+        totals.cost = (
+            totals.input_tokens * input_price + totals.output_tokens * output_price
+        ) / 1_000_000
+        totals.seconds = (
+            totals.input_tokens / self.input_tokens_per_second
+            + totals.output_tokens / self.output_tokens_per_second
+        )
+
+        return totals
+
+    @staticmethod
+    def _request_tokens(request: dict) -> int:
+        schema = json.dumps(request["output_structure"].model_json_schema())
+
+        return estimate_tokens(request["instructions"] + request["prompt"] + schema)
@@ -0,0 +1,10 @@
+PACKED_FUNCTIONS_PROMPT = """
+
+**MULTIPLE FUNCTIONS:**
+This request contains several functions instead of one. Each function is
+wrapped in a <function id="..."> tag.
+
+1. Evaluate every function independently, applying all of the instructions above
+2. Return exactly one assessment per function in the `assessments` list
+3. Set the `node_id` of each assessment to the id of the function it describes
+"""
@@ -1,5 +1,4 @@
 import ast
-import astor
 from pydantic import BaseModel, ConfigDict
 from abc import ABC
 from typing import Optional
@@ -8,10 +7,16 @@ from typing import Dict
 
 from enum import Enum
 
+from docterella.parsers.source_buffer import SourceBuffer
+
 class MetaDataTypes(Enum):
     FUNCTION_TYPE  = "function"
     CLASS_TYPE = "class"
 
+def make_node_id(source_path: Optional[str], name: str, lineno: int) -> str:
+    """Identifier of a node that is stable between runs over the same source"""
+    return f"{source_path} : {name} - {lineno}"
+
 class Metadata(BaseModel, ABC):
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
@@ -26,16 +31,27 @@ class Metadata(BaseModel, ABC):
     source_code: str
 
     @staticmethod
-    def kv_from_ast(node: ast.AST) -> Dict:
+    def kv_from_ast(node: ast.AST, source: SourceBuffer = None) -> Dict:
+        # slicing the original text keeps the code exactly as written, the
+        # ast is only unparsed when the file contents are unavailable
+        if source is None:
+            source_code = ast.unparse(node)
+        else:
+            source_code = source.source(node)
+
         return {
             "name": node.name,
             "lineno": node.lineno,
             "end_lineno": node.end_lineno,
             "col_offset": node.col_offset,
             "end_col_offset": node.end_col_offset,
-            "source_code": astor.to_source(node),
+            "source_code": source_code,
         }
     
+    @property
+    def node_id(self) -> str:
+        return make_node_id(self.source_path, self.name, self.lineno)
+
     def to_dict(self):
         return self.model_dump()
 
@@ -43,42 +59,51 @@ class FunctionMetadata(Metadata):
     type: ClassVar[str] = MetaDataTypes.FUNCTION_TYPE
 
     @staticmethod
-    def from_ast(node: ast.FunctionDef, source_path: str = None):
+    def from_ast(
+        node: ast.FunctionDef, source_path: str = None, source: SourceBuffer = None
+    ):
         if not isinstance(node, ast.FunctionDef):
             raise TypeError("Argument `node` must be type ast.FunctionDef")
     
-        return FunctionMetadata(source_path=source_path, **Metadata.kv_from_ast(node))
+        return FunctionMetadata(
+            source_path=source_path, **Metadata.kv_from_ast(node, source)
+        )
 
 
 class ClassMetadata(Metadata):
     type: ClassVar[str] = MetaDataTypes.CLASS_TYPE
 
     docstring: Optional[str] = ""
-    constructor: FunctionMetadata
+    # None for classes without an __init__ of their own
+    constructor: Optional[FunctionMetadata] = None
 
     @staticmethod
-    def from_ast(node: ast.ClassDef, source_path: str = None):
+    def from_ast(
+        node: ast.ClassDef, source_path: str = None, source: SourceBuffer = None
+    ):
         if not isinstance(node, ast.ClassDef):
             raise TypeError("Argument `node` must be type ast.ClassDef")
         
         docstring = ast.get_docstring(node)
 
-        constructor = ClassMetadata.__get_constructor(node, source_path)
+        constructor = ClassMetadata.__get_constructor(node, source_path, source)
 
         return ClassMetadata(
             source_path=source_path,
-            **Metadata.kv_from_ast(node),
+            **Metadata.kv_from_ast(node, source),
             constructor=constructor,
             docstring=docstring,
         )
     
     @staticmethod
-    def __get_constructor(node: ast.ClassDef, source_path: str = None):
+    def __get_constructor(
+        node: ast.ClassDef, source_path: str = None, source: SourceBuffer = None
+    ):
         for child in ast.iter_child_nodes(node):
             if not isinstance(child, ast.FunctionDef):
                 continue
 
             if child.name == "__init__":
-                return FunctionMetadata.from_ast(child, source_path)
+                return FunctionMetadata.from_ast(child, source_path, source)
             
         return None
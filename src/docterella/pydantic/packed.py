@@ -0,0 +1,24 @@
+from functools import lru_cache
+from pydantic import BaseModel
+from pydantic import create_model
+
+from typing import List
+from typing import Type
+
+@lru_cache(maxsize=None)
+def packed_output(output_structure: Type[BaseModel]) -> Type[BaseModel]:
+    """Builds the output model for a request that assesses several nodes
+
+    The returned model holds a list of `output_structure` assessments, each
+    extended with the `node_id` of the node it describes.
+    """
+    item = create_model(
+        f"Packed{output_structure.__name__}",
+        __base__=output_structure,
+        node_id=(str, ...),
+    )
+
+    return create_model(
+        f"Packed{output_structure.__name__}List",
+        assessments=(List[item], ...),
+    )
@@ -1,11 +1,11 @@
 
-from typing import Generator
+from typing import Iterable
 from docterella.results import ValidationResults
 
 import json
 
 class JSONReport:
-    def __init__(self, results: Generator[ValidationResults]):
+    def __init__(self, results: Iterable[ValidationResults]):
         self.results = results
 
         self.json = self.generate()
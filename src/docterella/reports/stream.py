@@ -0,0 +1,77 @@
+import json
+import os
+import textwrap
+
+from typing import IO
+from typing import Iterable
+
+from docterella.results import ValidationResults
+
+class StreamingReport:
+    """Writes results to a file one at a time as the runner produces them
+
+    Unlike `JSONReport` the results are never collected in memory, so the
+    file grows while the run is in progress and a crash loses at most the
+    results written since the last flush.
+
+    Parameters
+    ----------
+    results: Iterable[ValidationResults]
+        The results to write, typically `Runner.validate_sequence()`
+
+    array: bool
+        Write a single indented JSON array in the same layout as
+        `JSONReport` instead of one JSON object per line. The array is only
+        valid JSON once the run has finished
+
+    flush_every: int
+        Number of results between flushes of the file to the OS
+
+    fsync_every: int
+        Number of results between forcing the file to disk, never if None
+    """
+    def __init__(
+        self,
+        results: Iterable[ValidationResults],
+        array: bool = False,
+        flush_every: int = 1,
+        fsync_every: int = None,
+    ):
+        self.results = results
+        self.array = array
+        self.flush_every = flush_every
+        self.fsync_every = fsync_every
+
+    def to_file(self, filename: str) -> int:
+        with open(filename, 'w') as f:
+            return self.write(f)
+
+    def write(self, f: IO[str]) -> int:
+        """Writes every result to an open file, returning how many were written"""
+        count = 0
+
+        if self.array:
+            f.write("[")
+
+        for result in self.results:
+            if self.array:
+                f.write(",\n" if count else "\n")
+                f.write(textwrap.indent(json.dumps(result.to_dict(), indent=4), " " * 4))
+            else:
+                f.write(json.dumps(result.to_dict()) + "\n")
+
+            count += 1
+
+            if count % self.flush_every == 0:
+                f.flush()
+
+            if self.fsync_every and count % self.fsync_every == 0:
+                f.flush()
+                os.fsync(f.fileno())
+
+        if self.array:
+            f.write("\n]\n" if count else "]\n")
+
+        f.flush()
+
+        return count
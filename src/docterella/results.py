@@ -1,3 +1,4 @@
+from docterella.connections.usage import Usage
 from docterella.pydantic.assessments import Assessment
 from docterella.pydantic.metadata import Metadata
 
@@ -5,16 +6,44 @@ import json
 
 class ValidationResults:
     def __init__(
-        self, metadata: Metadata, assessment: Assessment
+        self,
+        metadata: Metadata,
+        assessment: Assessment,
+        skipped: str = None,
+        usage: Usage = None,
     ):
         self.metadata = metadata
         self.assessment = assessment
+        self.skipped = skipped
+        # None when no request was sent, such as for cached assessments
+        self.usage = usage
+
+    @classmethod
+    def skip(cls, metadata: Metadata, reason: str):
+        """Result of a node that was not validated, for example after a timeout"""
+        return cls(metadata, None, skipped=reason)
+
+    @property
+    def is_skipped(self) -> bool:
+        return self.skipped is not None
 
     def to_dict(self):
-        return {
-            "metadata": self.metadata.model_dump(),
+        if self.is_skipped:
+            return {
+                "metadata": self.metadata.to_dict(),
+                "assessment": None,
+                "skipped": self.skipped,
+            }
+
+        result = {
+            "metadata": self.metadata.to_dict(),
             "assessment": self.assessment.model_dump()
         }
+
+        if self.usage is not None:
+            result["usage"] = self.usage.to_dict()
+
+        return result
     
     def to_json(self):
         return json.dumps(self.to_dict(), indent=4)
@@ -1,20 +1,609 @@
+import asyncio
+import json
+import os
+import threading
+import time
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
+from concurrent.futures import wait
+
+from pydantic import ValidationError
+
 from docterella.parsers.sequence_parser import SequenceParser
 from docterella.agents.base import ValidationAgent
-from docterella.pydantic.metadata import ClassMetadata
-from docterella.pydantic.metadata import FunctionMetadata
+from docterella.agents.errors import InvalidResponseError
+from docterella.connections.batch_connection import BatchConnection
+from docterella.connections.errors import CircuitOpenError
+from docterella.connections.errors import RequestTimeoutError
+from docterella.connections.errors import TransientError
+from docterella.journal import Journal
+from docterella.packer import NodePacker
+from docterella.pydantic.metadata import MetaDataTypes
+from docterella.results import ValidationResults
+from docterella.scheduler import SizeScheduler
+from docterella.telemetry import RunUsage
+
+# errors after which a node is skipped rather than the run aborted, the
+# transient ones only reach the runner once the retry policy gave up
+_SKIPPED_ERRORS = (
+    RequestTimeoutError,
+    CircuitOpenError,
+    InvalidResponseError,
+    TransientError,
+    ConnectionError,
+)
+
+RUN_DEADLINE_EXCEEDED = "run deadline exceeded"
 
 class Runner:
-    def __init__(self, parser: SequenceParser, agent: ValidationAgent):
+    def __init__(
+        self,
+        parser: SequenceParser,
+        agent: ValidationAgent,
+        packer: NodePacker = None,
+        journal: Journal = None,
+        scheduler: SizeScheduler = None,
+        deadline: float = None,
+    ):
         self.parser = parser
         self.agent = agent
+        self.packer = packer
+        self.journal = journal
+        self.scheduler = scheduler
+        self.deadline = deadline
+
+        self.usage = RunUsage()
+        self._deadline_at = None
+
+    def validate_node(self, node):
+        if node.type == MetaDataTypes.CLASS_TYPE:
+            return self.agent.validate_class(node)
+
+        if node.type == MetaDataTypes.FUNCTION_TYPE:
+            return self.agent.validate_function(node)
+
+        return None
+
+    def validate_batch(self, batch):
+        results = self._replay(batch)
+        pending = [node for node, result in zip(batch, results) if result is None]
+
+        if pending:
+            validated = iter(self._validate_nodes(pending))
+            results = [next(validated) if r is None else r for r in results]
+
+        return results
+
+    def _validate_nodes(self, nodes):
+        remaining = self._remaining_time()
+
+        if remaining is not None and remaining <= 0:
+            return self._skip(nodes, RUN_DEADLINE_EXCEEDED)
+
+        try:
+            if remaining is None:
+                results = self._request_nodes(nodes)
+            else:
+                results = self._request_until(nodes, remaining)
+        except _SKIPPED_ERRORS as e:
+            return self._skip(nodes, f"{type(e).__name__}: {e}")
+        except TimeoutError:
+            # a timeout raised by the request itself is not the run's deadline
+            if remaining is None or self._remaining_time() > 0:
+                raise
+
+            return self._skip(nodes, RUN_DEADLINE_EXCEEDED)
+
+        self._record(results)
+
+        return results
+
+    def _request_nodes(self, nodes):
+        if len(nodes) == 1:
+            return [self.validate_node(nodes[0])]
+
+        return self.agent.validate_functions(nodes)
+
+    def _request_until(self, nodes, remaining: float):
+        """Validates the nodes, raising TimeoutError if it takes more than `remaining` seconds
+
+        A thread cannot be interrupted, so the request runs in a daemon
+        thread that is abandoned at the deadline and its response discarded.
+        """
+        future = Future()
+
+        def request():
+            try:
+                future.set_result(self._request_nodes(nodes))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=request, daemon=True).start()
+
+        return future.result(timeout=remaining)
+
+    def _skip(self, nodes, reason: str):
+        # skipped nodes are not journaled so a resumed run validates them
+        return [ValidationResults.skip(node, reason) for node in nodes]
+
+    def _remaining_time(self):
+        """Seconds left before the run deadline, None without a deadline"""
+        if self._deadline_at is None:
+            return None
+
+        return self._deadline_at - time.monotonic()
+
+    def _replay(self, batch):
+        """Rebuilds the results of nodes that were completed in a previous run"""
+        if self.journal is None:
+            return [None] * len(batch)
+
+        results = []
+
+        for node in batch:
+            entry = self.journal.get(node.node_id)
+            result = None
+
+            if entry is not None:
+                if node.type == MetaDataTypes.CLASS_TYPE:
+                    output = self.agent.class_output
+                else:
+                    output = self.agent.function_output
+
+                # entries written with a different output structure are redone
+                try:
+                    result = ValidationResults(node, output.model_validate(entry["assessment"]))
+                except ValidationError:
+                    pass
+
+            results.append(result)
+
+        return results
+
+    def _record(self, results):
+        """Adds freshly validated results to the run usage and the journal"""
+        for result in results:
+            if result is None or result.is_skipped:
+                continue
+
+            self.usage.add(result)
+
+            if self.journal is not None:
+                self.journal.record(result)
+
+    def batches(self):
+        """Generates the lists of parsed nodes that are validated together"""
+        # the run, and so its deadline, starts when the first batch is requested
+        if self.deadline is not None:
+            self._deadline_at = time.monotonic() + self.deadline
+
+        if self.packer is None:
+            for node in self.parser.parse():
+                yield [node]
+        else:
+            yield from self.packer.pack(self.parser.parse())
 
     def validate_sequence(self):
-        for node in self.parser.parse():
-            if isinstance(node, ClassMetadata):
-                yield self.agent.validate_class(node)
+        if self.scheduler is None:
+            results = (self.validate_batch(batch) for batch in self.batches())
+        else:
+            results = self.scheduler.restore(
+                (position, self.validate_batch(batch))
+                for position, batch in self._scheduled_batches()
+            )
+
+        for batch_results in results:
+            for result in batch_results:
+                if result is not None:
+                    yield result
 
-            if isinstance(node, FunctionMetadata):
-                yield self.agent.validate_function(node)
+    def _scheduled_batches(self):
+        """Pairs every batch with its source position, in the scheduler's order"""
+        batches = enumerate(self.batches())
+
+        if self.scheduler is not None:
+            batches = self.scheduler.schedule(batches)
+
+        return batches
 
     def run(self):
-        return [res for res in self.validate_sequence()]
\ No newline at end of file
+        return [res for res in self.validate_sequence()]
+
+
+class ConcurrentRunner(Runner):
+    """Runner that validates several nodes at once using a thread pool
+
+    Parameters
+    ----------
+    parser: SequenceParser
+        Parser producing the nodes to validate
+
+    agent: ValidationAgent
+        Agent used to validate each node. The agent's connection must be safe
+        to call from multiple threads
+
+    max_in_flight: int
+        Maximum number of requests sent to the model at the same time
+
+    ordered: bool
+        When True results are yielded in source order, otherwise they are
+        yielded as soon as they complete
+
+    packer: NodePacker
+        Optional packer grouping small functions into shared requests
+
+    journal: Journal
+        Optional journal recording each result as it completes. Nodes
+        already in a resumed journal are not validated again
+
+    scheduler: SizeScheduler
+        Optional scheduler deciding the order nodes are sent in. Results are
+        still yielded in source order when `ordered` is True
+
+    deadline: float
+        Optional number of seconds the run may take. Nodes not validated in
+        time, like nodes whose request timed out, get skipped results
+    """
+    def __init__(
+        self,
+        parser: SequenceParser,
+        agent: ValidationAgent,
+        max_in_flight: int = 4,
+        ordered: bool = True,
+        packer: NodePacker = None,
+        journal: Journal = None,
+        scheduler: SizeScheduler = None,
+        deadline: float = None,
+    ):
+        super().__init__(parser, agent, packer, journal, scheduler, deadline)
+
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+
+        self.max_in_flight = max_in_flight
+        self.ordered = ordered
+
+    def validate_sequence(self):
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            if self.scheduler is None and self.ordered:
+                results = (r for _, r in self._validate_ordered(executor))
+            elif self.scheduler is None or not self.ordered:
+                results = (r for _, r in self._validate_as_completed(executor))
+            else:
+                # scheduled batches complete out of source order anyway
+                results = self.scheduler.restore(self._validate_as_completed(executor))
+
+            for batch_results in results:
+                for result in batch_results:
+                    if result is not None:
+                        yield result
+
+    def _validate_ordered(self, executor: ThreadPoolExecutor):
+        # the window is larger than the pool so one slow node at the head of
+        # the queue does not leave the remaining workers idle
+        window = 2 * self.max_in_flight
+        pending = deque()
+
+        for position, batch in self._scheduled_batches():
+            pending.append((position, executor.submit(self.validate_batch, batch)))
+
+            if len(pending) >= window:
+                position, future = pending.popleft()
+                yield position, future.result()
+
+        while pending:
+            position, future = pending.popleft()
+            yield position, future.result()
+
+    def _validate_as_completed(self, executor: ThreadPoolExecutor):
+        positions = {}
+
+        for position, batch in self._scheduled_batches():
+            positions[executor.submit(self.validate_batch, batch)] = position
+
+            if len(positions) >= self.max_in_flight:
+                done, _ = wait(positions, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    yield positions.pop(future), future.result()
+
+        for future in as_completed(list(positions)):
+            yield positions.pop(future), future.result()
+
+
+class AsyncRunner(Runner):
+    """Runner that validates nodes with the connection's `aprompt` coroutine
+
+    Results are exposed as an async iterator from `validate_sequence`.
+
+    Parameters
+    ----------
+    parser: SequenceParser
+        Parser producing the nodes to validate
+
+    agent: ValidationAgent
+        Agent used to validate each node
+
+    max_in_flight: int
+        Maximum number of requests awaiting a response at the same time
+
+    ordered: bool
+        When True results are yielded in source order, otherwise they are
+        yielded as soon as they complete
+
+    packer: NodePacker
+        Optional packer grouping small functions into shared requests
+
+    journal: Journal
+        Optional journal recording each result as it completes. Nodes
+        already in a resumed journal are not validated again
+
+    scheduler: SizeScheduler
+        Optional scheduler deciding the order nodes are sent in. Results are
+        still yielded in source order when `ordered` is True
+
+    deadline: float
+        Optional number of seconds the run may take. Nodes not validated in
+        time, like nodes whose request timed out, get skipped results
+    """
+    def __init__(
+        self,
+        parser: SequenceParser,
+        agent: ValidationAgent,
+        max_in_flight: int = 4,
+        ordered: bool = True,
+        packer: NodePacker = None,
+        journal: Journal = None,
+        scheduler: SizeScheduler = None,
+        deadline: float = None,
+    ):
+        super().__init__(parser, agent, packer, journal, scheduler, deadline)
+
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+
+        self.max_in_flight = max_in_flight
+        self.ordered = ordered
+
+    async def avalidate_node(self, node):
+        if node.type == MetaDataTypes.CLASS_TYPE:
+            return await self.agent.avalidate_class(node)
+
+        if node.type == MetaDataTypes.FUNCTION_TYPE:
+            return await self.agent.avalidate_function(node)
+
+        return None
+
+    async def avalidate_batch(self, batch):
+        results = self._replay(batch)
+        pending = [node for node, result in zip(batch, results) if result is None]
+
+        if pending:
+            validated = iter(await self._avalidate_nodes(pending))
+            results = [next(validated) if r is None else r for r in results]
+
+        return results
+
+    async def _avalidate_nodes(self, nodes):
+        remaining = self._remaining_time()
+
+        if remaining is not None and remaining <= 0:
+            return self._skip(nodes, RUN_DEADLINE_EXCEEDED)
+
+        # requests still awaiting a response at the deadline are cancelled
+        try:
+            results = await asyncio.wait_for(self._arequest_nodes(nodes), remaining)
+        except _SKIPPED_ERRORS as e:
+            return self._skip(nodes, f"{type(e).__name__}: {e}")
+        except asyncio.TimeoutError:
+            return self._skip(nodes, RUN_DEADLINE_EXCEEDED)
+
+        self._record(results)
+
+        return results
+
+    async def _arequest_nodes(self, nodes):
+        if len(nodes) == 1:
+            return [await self.avalidate_node(nodes[0])]
+
+        return await self.agent.avalidate_functions(nodes)
+
+    async def validate_sequence(self):
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+
+        async def bounded(batch):
+            async with semaphore:
+                return await self.avalidate_batch(batch)
+
+        if self.scheduler is None and self.ordered:
+            results = self._strip_positions(self._validate_ordered(bounded))
+        elif self.scheduler is None or not self.ordered:
+            results = self._strip_positions(self._validate_as_completed(bounded))
+        else:
+            results = self.scheduler.arestore(self._validate_as_completed(bounded))
+
+        async for batch_results in results:
+            for result in batch_results:
+                if result is not None:
+                    yield result
+
+    async def run(self):
+        return [res async for res in self.validate_sequence()]
+
+    @staticmethod
+    async def _strip_positions(results):
+        async for _, batch_results in results:
+            yield batch_results
+
+    async def _validate_ordered(self, bounded):
+        window = 2 * self.max_in_flight
+        pending = deque()
+
+        try:
+            for position, batch in self._scheduled_batches():
+                pending.append((position, asyncio.ensure_future(bounded(batch))))
+
+                if len(pending) >= window:
+                    position, task = pending.popleft()
+                    yield position, await task
+
+            while pending:
+                position, task = pending.popleft()
+                yield position, await task
+        finally:
+            for _, task in pending:
+                task.cancel()
+
+    async def _validate_as_completed(self, bounded):
+        positions = {}
+
+        try:
+            for position, batch in self._scheduled_batches():
+                positions[asyncio.ensure_future(bounded(batch))] = position
+
+                if len(positions) >= self.max_in_flight:
+                    done, _ = await asyncio.wait(
+                        positions, return_when=asyncio.FIRST_COMPLETED
+                    )
+
+                    for task in done:
+                        yield positions.pop(task), task.result()
+
+            while positions:
+                done, _ = await asyncio.wait(
+                    positions, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                for task in done:
+                    yield positions.pop(task), task.result()
+        finally:
+            for task in positions:
+                task.cancel()
+
+
+class BatchRunner(Runner):
+    """Runner that sends every request through the provider's batch api
+
+    All the nodes are parsed up front and the requests the agent cannot
+    answer locally are submitted as a single batch, which is polled until
+    the provider has finished it. The batch id is saved to `state_path`
+    so an interrupted run picks up the same batch instead of paying for
+    a new one. Requests without a valid response in the batch are sent
+    again on their own.
+
+    Parameters
+    ----------
+    parser: SequenceParser
+        Parser producing the nodes to validate
+
+    agent: ValidationAgent
+        Agent used to validate each node, its connection must be a
+        `BatchConnection`
+
+    state_path: str
+        File recording the submitted batch, removed once its results have
+        been collected
+
+    poll_interval: float
+        Seconds to wait between checks on the batch
+
+    journal: Journal
+        Optional journal recording each result as it completes. Nodes
+        already in a resumed journal are not validated again
+    """
+    def __init__(
+        self,
+        parser: SequenceParser,
+        agent: ValidationAgent,
+        state_path: str,
+        poll_interval: float = 60.0,
+        journal: Journal = None,
+    ):
+        if not isinstance(agent.connection, BatchConnection):
+            raise TypeError("The agent's connection must be a BatchConnection")
+
+        super().__init__(parser, agent, journal=journal)
+
+        self.state_path = state_path
+        self.poll_interval = poll_interval
+
+    def validate_sequence(self):
+        nodes = [
+            node for node in self.parser.parse()
+            if node.type in (MetaDataTypes.CLASS_TYPE, MetaDataTypes.FUNCTION_TYPE)
+        ]
+
+        results = self._replay(nodes)
+        pending = [node for node, result in zip(nodes, results) if result is None]
+
+        if pending:
+            validated = iter(self._validate_batched(pending))
+            results = [next(validated) if r is None else r for r in results]
+
+        yield from results
+
+    def _validate_batched(self, nodes):
+        assessments, requests, keys = self.agent.prepare_batch(nodes)
+        responses = {}
+
+        if requests:
+            state = self._load_state()
+
+            if state is None:
+                state = self._submit(nodes, requests)
+
+            self._wait(state["batch_id"])
+            responses = self._collect(state, nodes)
+
+        results = self.agent.complete_batch(nodes, assessments, requests, keys, responses)
+
+        self._record(results)
+
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+
+        return results
+
+    def _submit(self, nodes, requests):
+        # node ids contain characters the providers do not accept as custom ids
+        batch_id = self.agent.connection.submit_batch(
+            {f"node-{i}": request for i, request in requests.items()}
+        )
+
+        state = {
+            "batch_id": batch_id,
+            "node_ids": {f"node-{i}": nodes[i].node_id for i in requests},
+        }
+
+        with open(self.state_path, "w") as f:
+            json.dump(state, f)
+
+        return state
+
+    def _load_state(self):
+        if not os.path.exists(self.state_path):
+            return None
+
+        with open(self.state_path) as f:
+            return json.load(f)
+
+    def _wait(self, batch_id: str):
+        while not self.agent.connection.batch_done(batch_id):
+            time.sleep(self.poll_interval)
+
+    def _collect(self, state, nodes):
+        """Maps the batch responses back to the positions of their nodes"""
+        positions = {node.node_id: i for i, node in enumerate(nodes)}
+        responses = {}
+
+        for custom_id, completion in self.agent.connection.batch_results(state["batch_id"]).items():
+            node_id = state["node_ids"].get(custom_id)
+
+            if node_id in positions:
+                responses[positions[node_id]] = completion
+
+        return responses
@@ -0,0 +1,90 @@
+import heapq
+
+from typing import Iterable
+from typing import List
+from typing import Tuple
+
+from docterella.pydantic.metadata import MetaDataTypes
+from docterella.tokens import estimate_tokens
+
+LONGEST_FIRST = "longest_first"
+SHORTEST_FIRST = "shortest_first"
+
+class SizeScheduler:
+    """Orders batches of nodes by their estimated size before they are validated
+
+    Starting the largest batches first keeps one large node at the end of a
+    concurrent run from holding up its completion, while starting the
+    smallest first returns most results soonest. Every parsed node has to
+    be read before the first batch is scheduled, so use compact node
+    records for large trees. `restore` puts results back in source order.
+
+    Parameters
+    ----------
+    order: str
+        Either "longest_first" or "shortest_first"
+    """
+    def __init__(self, order: str = LONGEST_FIRST):
+        if order not in (LONGEST_FIRST, SHORTEST_FIRST):
+            raise ValueError(f"The order {order} is unknown")
+
+        self.order = order
+
+    def schedule(self, batches: Iterable[Tuple[int, List]]) -> List[Tuple[int, List]]:
+        """Sorts batches, paired with their source position, into the order to run them"""
+        return sorted(
+            batches,
+            key=lambda item: self.estimate(item[1]),
+            reverse=self.order == LONGEST_FIRST,
+        )
+
+    def restore(self, results: Iterable[Tuple[int, List]]):
+        """Yields the results of every batch in source order as soon as it can
+
+        The results of a batch are held back until the results of every
+        batch before it in the source have been yielded.
+        """
+        waiting = []
+        position = 0
+
+        for item in results:
+            heapq.heappush(waiting, item)
+
+            while waiting and waiting[0][0] == position:
+                yield heapq.heappop(waiting)[1]
+                position += 1
+
+        # only reached with gaps, when batches were left out of the results
+        while waiting:
+            yield heapq.heappop(waiting)[1]
+
+    async def arestore(self, results):
+        """Asynchronous counterpart of `restore` for an async iterator of results"""
+        waiting = []
+        position = 0
+
+        async for item in results:
+            heapq.heappush(waiting, item)
+
+            while waiting and waiting[0][0] == position:
+                yield heapq.heappop(waiting)[1]
+                position += 1
+
+        while waiting:
+            yield heapq.heappop(waiting)[1]
+
+    @staticmethod
+    def estimate(batch: List) -> int:
+        """Estimated prompt tokens of a batch, the response grows along with it"""
+        total = 0
+
+        for node in batch:
+            if node.type == MetaDataTypes.CLASS_TYPE:
+                if node.constructor is not None:
+                    total += estimate_tokens(node.constructor.source_code)
+
+                total += estimate_tokens(node.docstring or "")
+            else:
+                total += estimate_tokens(node.source_code)
+
+        return total
@@ -0,0 +1,63 @@
+import threading
+
+from typing import Dict
+
+from docterella.connections.usage import Usage
+from docterella.results import ValidationResults
+
+class RunUsage:
+    """Tokens and timing actually spent by a run, broken down per file
+
+    Runners add the results validated during the run, where those answered
+    by the cache or the prevalidator count as nodes without any usage.
+    Safe to update from several threads.
+    """
+    def __init__(self):
+        self.nodes = 0
+        self.files: Dict[str, Usage] = {}
+        self.total = Usage.empty()
+
+        self._lock = threading.Lock()
+
+    def add(self, result: ValidationResults):
+        with self._lock:
+            self.nodes += 1
+
+            if result.usage is None:
+                return
+
+            self.files.setdefault(result.metadata.source_path, Usage.empty()).add(result.usage)
+            self.total.add(result.usage)
+
+    def to_dict(self) -> Dict:
+        return {
+            "nodes": self.nodes,
+            "files": {k: v.to_dict() for k, v in self.files.items()},
+            "total": self.total.to_dict(),
+        }
+
+    def to_text(self) -> str:
+        header = (
+            f"{'':<48} {'requests':>8} {'input tok':>10} {'output tok':>10} "
+            f"{'cache read':>10} {'ttft s':>7} {'tok/s':>7}"
+        )
+        lines = ["per file", header]
+        lines += [self._format_row(name, usage) for name, usage in self.files.items()]
+        lines += ["", "total", header, self._format_row("", self.total)]
+
+        return "\n".join(lines)
+
+    @staticmethod
+    def _format_row(name: str, usage: Usage) -> str:
+        if len(name) > 48:
+            name = "..." + name[-45:]
+
+        def optional(value, spec):
+            return "-" if value is None else format(value, spec)
+
+        return (
+            f"{name:<48} {usage.requests:>8.0f} {usage.input_tokens:>10.0f} "
+            f"{usage.output_tokens:>10.0f} {optional(usage.cache_read_ratio, '.1%'):>10} "
+            f"{optional(usage.time_to_first_token, '.2f'):>7} "
+            f"{optional(usage.tokens_per_second, '.1f'):>7}"
+        )
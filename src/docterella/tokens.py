@@ -0,0 +1,23 @@
+import re
+
+_PIECES = re.compile(r"\w+|[^\w\s]|\s+")
+
+def estimate_tokens(text: str) -> int:
+    """Approximates the number of tokens a model tokenizer produces for text
+
+    Words count as one token per four characters, punctuation as one token
+    each and line breaks (with their indentation) as one token. This tracks
+    BPE tokenizers on source code closely enough for budgeting without
+    depending on any provider's tokenizer.
+    """
+    total = 0
+
+    for piece in _PIECES.findall(text):
+        if piece.isspace():
+            total += "\n" in piece
+        elif piece[0].isalnum() or piece[0] == "_":
+            total += (len(piece) + 3) // 4
+        else:
+            total += 1
+
+    return total